@@ -0,0 +1,50 @@
+"""Статические файлы с отпечатком содержимого в имени.
+
+asset_url('chart.js') в шаблонах даёт /assets/chart.<sha1[:10]>.js. Такой
+адрес меняется вместе с файлом, поэтому отдаётся с Cache-Control
+immutable на ASSET_MAX_AGE секунд: повторные визиты не запрашивают файл
+вовсе. Отпечатки считаются один раз на процесс (при DEBUG — при каждом
+изменении файла).
+"""
+import hashlib
+import os
+
+from flask import abort, current_app, send_from_directory, url_for
+from werkzeug.security import safe_join
+
+
+def fingerprint(filename):
+    """Первые 10 знаков sha1 содержимого файла из static/."""
+    path = os.path.join(current_app.static_folder, filename)
+    cache = current_app.extensions["assets"]
+    mtime = os.path.getmtime(path) if current_app.debug else None
+    cached = cache.get(filename)
+    if cached is None or cached[0] != mtime:
+        with open(path, "rb") as f:
+            cached = cache[filename] = (mtime, hashlib.sha1(f.read()).hexdigest()[:10])
+    return cached[1]
+
+
+def asset_url(filename):
+    stem, ext = os.path.splitext(filename)
+    return url_for("asset", filename=f"{stem}.{fingerprint(filename)}{ext}")
+
+
+def serve_asset(filename):
+    stem, ext = os.path.splitext(filename)
+    original, _, digest = stem.rpartition(".")
+    name = original + ext
+    path = safe_join(current_app.static_folder, name) if original else None
+    if path is None or not os.path.isfile(path) or digest != fingerprint(name):
+        abort(404)  # старый отпечаток: страница ссылается на прежнюю версию файла
+    response = send_from_directory(current_app.static_folder, name,
+                                   max_age=current_app.config["ASSET_MAX_AGE"])
+    response.cache_control.immutable = True
+    response.cache_control.public = True
+    return response
+
+
+def init_app(app):
+    app.extensions["assets"] = {}  # имя файла -> (mtime, отпечаток)
+    app.add_url_rule("/assets/<path:filename>", "asset", serve_asset)
+    app.context_processor(lambda: {"asset_url": asset_url})
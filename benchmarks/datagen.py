@@ -0,0 +1,88 @@
+"""Синтетические данные для бенчмарков: спортсмены, тренеры, тренировки, комментарии.
+
+Один и тот же seed даёт одни и те же данные, поэтому замеры разных
+версий кода можно сравнивать между собой. Все пользователи получают
+пароль PASSWORD, хэш считается один раз.
+
+    from benchmarks.datagen import generate
+    with app.app_context():
+        ids = generate(users=50, coaches=2, workouts_per_user=1000, comments_per_workout=0.2)
+"""
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+import stats
+from catalog import get_catalog
+from models import db, User, CoachAthlete, Workout, Comment
+
+PASSWORD = "bench"
+EXERCISES = ["Squat", "Bench Press", "Deadlift", "Overhead Press", "Pull Up", "Barbell Row",
+             "Lunge", "Dip", "Leg Press", "Curl"]
+COMMENTS = ["Отлично!", "Следи за техникой", "Добавь вес", "Хороший темп", "Отдохни пару дней"]
+BATCH_SIZE = 5000
+
+
+def generate(users=10, coaches=1, workouts_per_user=200, comments_per_workout=0.1, seed=1):
+    """Заполняет пустую базу и возвращает {'users': [id...], 'coaches': [id...]}.
+
+    comments_per_workout — среднее число комментариев на тренировку (может быть дробным).
+    """
+    rnd = random.Random(seed)
+    password_hash = generate_password_hash(PASSWORD, method="pbkdf2:sha256:1000")
+
+    def add_users(prefix, count, role):
+        db.session.execute(insert(User), [
+            {"username": f"{prefix}{i}", "password_hash": password_hash, "role": role}
+            for i in range(count)
+        ])
+        return [u.id for u in User.query.filter(User.role == role, User.username.like(f"{prefix}%"))
+                .order_by(User.id)]
+
+    user_ids = add_users("athlete", users, "user")
+    coach_ids = add_users("coach", coaches, "coach")
+    # спортсмены распределены между тренерами поровну
+    coach_of = {user_id: coach_ids[i % len(coach_ids)] for i, user_id in enumerate(user_ids)} if coach_ids else {}
+    if coach_of:
+        db.session.execute(insert(CoachAthlete), [
+            {"coach_id": coach_id, "athlete_id": user_id} for user_id, coach_id in coach_of.items()
+        ])
+
+    exercise_ids = {exercise: get_catalog().exercise_id(exercise) for exercise in EXERCISES}
+    start = date.today() - timedelta(days=workouts_per_user)
+    batch = []
+    for user_id in user_ids:
+        weights = {exercise: rnd.uniform(20, 100) for exercise in EXERCISES}
+        for day in range(workouts_per_user):
+            exercise = rnd.choice(EXERCISES)
+            weights[exercise] = max(0, weights[exercise] + rnd.uniform(-2.5, 3))
+            batch.append({"user_id": user_id, "date": start + timedelta(days=day),
+                          "exercise_id": exercise_ids[exercise],
+                          "sets": rnd.randint(1, 5), "reps": rnd.randint(1, 12),
+                          "weight": round(weights[exercise], 1)})
+            if len(batch) >= BATCH_SIZE:
+                db.session.execute(insert(Workout), batch)
+                batch = []
+    if batch:
+        db.session.execute(insert(Workout), batch)
+
+    if coach_ids and comments_per_workout:
+        workouts = db.session.execute(db.select(Workout.id, Workout.user_id, Workout.date)
+                                      .order_by(Workout.id)).all()
+        comments = []
+        for workout_id, user_id, day in workouts:
+            count = int(comments_per_workout) + (rnd.random() < comments_per_workout % 1)
+            for _ in range(count):
+                comments.append({"workout_id": workout_id, "coach_id": coach_of[user_id],
+                                 "content": rnd.choice(COMMENTS), "date": day})
+            if len(comments) >= BATCH_SIZE:
+                db.session.execute(insert(Comment), comments)
+                comments = []
+        if comments:
+            db.session.execute(insert(Comment), comments)
+
+    stats.rebuild_rollups()
+    db.session.commit()
+    return {"users": user_ids, "coaches": coach_ids}
@@ -0,0 +1,50 @@
+"""Сколько входов в секунду выдерживает один воркер при разных параметрах хэша.
+
+На /login почти всё время уходит на проверку хэша пароля, поэтому
+замеряется check_password_hash для каждого метода в одном потоке.
+
+    python benchmarks/login_throughput.py
+    python benchmarks/login_throughput.py --seconds 5 scrypt:16384:8:1 pbkdf2:sha256:600000
+
+Выбранный метод записывается в PASSWORD_HASH_METHOD; старые хэши
+пересчитываются при следующем входе пользователя.
+"""
+import argparse
+import time
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+DEFAULT_METHODS = [
+    "scrypt:32768:8:1",      # значение werkzeug по умолчанию
+    "scrypt:16384:8:1",
+    "pbkdf2:sha256:1000000",
+    "pbkdf2:sha256:600000",
+    "pbkdf2:sha256:200000",
+]
+
+
+def measure(method, seconds):
+    password_hash = generate_password_hash("benchmark-password", method=method)
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        check_password_hash(password_hash, "benchmark-password")
+        count += 1
+    elapsed = time.perf_counter() - started
+    return count / elapsed, elapsed / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("methods", nargs="*", default=DEFAULT_METHODS)
+    parser.add_argument("--seconds", type=float, default=2.0, help="время замера на один метод")
+    args = parser.parse_args()
+
+    print(f"{'метод':<26}{'мс/вход':>10}{'входов/с':>12}")
+    for method in args.methods:
+        per_second, ms = measure(method, args.seconds)
+        print(f"{method:<26}{ms:>10.1f}{per_second:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
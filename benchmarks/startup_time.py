@@ -0,0 +1,51 @@
+"""Время холодного старта: `import app` и create_app() в чистом процессе.
+
+Каждый замер — отдельный интерпретатор, чтобы модули не брались из
+sys.modules. Печатается медиана по нескольким запускам.
+
+    python benchmarks/startup_time.py
+    python benchmarks/startup_time.py --runs 20
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app()
+created = time.perf_counter()
+print(imported - started, created - imported, len(sys.modules))
+"""
+
+
+def measure(runs):
+    imports, factories, modules = [], [], []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, check=True,
+                                capture_output=True, text=True).stdout.split()
+        imports.append(float(output[0]) * 1000)
+        factories.append(float(output[1]) * 1000)
+        modules.append(int(output[2]))
+    return statistics.median(imports), statistics.median(factories), max(modules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="число запусков интерпретатора")
+    args = parser.parse_args()
+
+    import_ms, factory_ms, module_count = measure(args.runs)
+    print(f"import app:    {import_ms:8.1f} мс")
+    print(f"create_app():  {factory_ms:8.1f} мс")
+    print(f"всего:         {import_ms + factory_ms:8.1f} мс, модулей загружено: {module_count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Нагрузочный замер основных страниц на синтетических данных.
+
+Данные генерирует benchmarks/datagen.py во временную базу SQLite,
+запросы идут через тестовый клиент Flask (без сети). Для каждой
+страницы печатаются p50/p95 времени ответа, SQL-запросов на запрос
+и пиковая память Python (tracemalloc, отдельным проходом, чтобы не
+искажать время).
+
+    python benchmarks/web_load.py
+    python benchmarks/web_load.py --users 50 --workouts 2000 --requests 200 --save before.json
+    python benchmarks/web_load.py --users 50 --workouts 2000 --requests 200 --compare before.json
+
+По умолчанию кэш страниц выключен, чтобы мерить саму работу; --cache включает его.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import event
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import create_app  # noqa: E402
+from benchmarks.datagen import generate, PASSWORD  # noqa: E402
+from models import db  # noqa: E402
+
+MEMORY_REQUESTS = 5
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+
+
+def add_form(i):
+    return {"date": "2025-01-01", "exercise": "Squat", "sets": "3", "reps": "5", "weight": str(60 + i % 40)}
+
+
+SCENARIOS = [
+    # имя, роль, метод, адрес, данные формы
+    ("dashboard", "user", "GET", "/dashboard", None),
+    ("progress", "user", "GET", "/progress", None),
+    ("statistics", "user", "GET", "/statistics", None),
+    ("coach", "coach", "GET", "/coach", None),
+    ("add", "user", "POST", "/add", add_form),
+]
+
+
+def run_scenario(client, engine, method, url, form, requests):
+    queries = [0]
+
+    def on_execute(*args):
+        queries[0] += 1
+
+    def send(i):
+        data = form(i) if form else None
+        rv = client.open(url, method=method, data=data)
+        assert rv.status_code in (200, 302), f"{url}: {rv.status_code}"
+
+    send(0)  # прогрев: компиляция шаблонов, первые соединения
+    latencies = []
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        for i in range(requests):
+            started = time.perf_counter()
+            send(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+
+    tracemalloc.start()
+    try:
+        for i in range(MEMORY_REQUESTS):
+            send(i)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {"p50_ms": percentile(latencies, 50), "p95_ms": percentile(latencies, 95),
+            "queries": queries[0] / requests, "peak_kib": peak / 1024}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--coaches", type=int, default=2)
+    parser.add_argument("--workouts", type=int, default=500, help="тренировок на спортсмена")
+    parser.add_argument("--comments", type=float, default=0.2, help="комментариев на тренировку в среднем")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=50, help="запросов на страницу")
+    parser.add_argument("--cache", action="store_true", help="не выключать кэш страниц")
+    parser.add_argument("--save", help="записать результат в JSON")
+    parser.add_argument("--compare", help="сравнить с результатом из JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                  "RESPONSE_CACHE_PATH": os.path.join(tmp, "cache.db")}
+        if not args.cache:
+            config["RESPONSE_CACHE"] = None
+        app = create_app(config)
+
+        with app.app_context():
+            db.create_all()
+            started = time.perf_counter()
+            generate(args.users, args.coaches, args.workouts, args.comments, args.seed)
+            print(f"данные: {args.users} спортсменов x {args.workouts} тренировок, "
+                  f"{args.coaches} тренеров, {time.perf_counter() - started:.1f} с")
+            engine = db.engine
+
+        clients = {}
+        for role, username in (("user", "athlete0"), ("coach", "coach0")):
+            clients[role] = app.test_client()
+            clients[role].post("/login", data={"username": username, "password": PASSWORD})
+
+        results = {}
+        for name, role, method, url, form in SCENARIOS:
+            results[name] = run_scenario(clients[role], engine, method, url, form, args.requests)
+        with app.app_context():
+            db.engine.dispose()
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f)
+
+    print(f"{'страница':<12}{'p50, мс':>10}{'p95, мс':>10}{'SQL/запр':>10}{'пик, КиБ':>11}")
+    for name, r in results.items():
+        line = f"{name:<12}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['queries']:>10.1f}{r['peak_kib']:>11.0f}"
+        if name in previous:
+            change = (r['p50_ms'] / previous[name]['p50_ms'] - 1) * 100
+            line += f"   p50 {change:+.0f}%, SQL {r['queries'] - previous[name]['queries']:+.1f}"
+        print(line)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+"""Кэш готовых страниц по пользователю и представлению.
+
+Два бэкенда с одинаковым интерфейсом:
+- MemoryCache — LRU в памяти процесса с TTL и ограничением размера;
+- SQLiteCache — общий файл SQLite, когда приложение запущено в нескольких воркерах.
+
+Записи сбрасываются целиком для пользователя (invalidate_user), когда он
+или тренер меняют его данные. Счётчики hits/misses считаются в каждом
+процессе отдельно.
+
+Кэш приложения создаётся в init_app и берётся через get_cache().
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+from flask_login import current_user
+
+
+class MemoryCache:
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # (user_id, key) -> (expires, value)
+        self._keys_by_user = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, key):
+        with self._lock:
+            entry = self._entries.get((user_id, key))
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove((user_id, key))
+                self.misses += 1
+                return None
+            self._entries.move_to_end((user_id, key))
+            self.hits += 1
+            return entry[1]
+
+    def set(self, user_id, key, value):
+        with self._lock:
+            self._entries[(user_id, key)] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end((user_id, key))
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove((user_id, key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def stats(self):
+        return {"backend": "memory", "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "size": len(self._entries)}
+
+    def _remove(self, entry_key):
+        self._entries.pop(entry_key, None)
+        user_id, key = entry_key
+        keys = self._keys_by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+
+class SQLiteCache:
+    def __init__(self, path, max_entries=10000, ttl=300):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "user_id INTEGER NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires REAL NOT NULL, PRIMARY KEY (user_id, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_expires ON response_cache (expires)")
+
+    def _connect(self):
+        # у каждого потока своё соединение
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, user_id, key):
+        row = self._connect().execute(
+            "SELECT value FROM response_cache WHERE user_id = ? AND key = ? AND expires >= ?",
+            (user_id, key, time.time())
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def set(self, user_id, key, value):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache (user_id, key, value, expires) VALUES (?, ?, ?, ?)",
+                (user_id, key, value, time.time() + self.ttl)
+            )
+            size = conn.execute("SELECT count(*) FROM response_cache").fetchone()[0]
+            if size > self.max_entries:
+                # сначала выбрасываем записи, которые истекут раньше всех
+                conn.execute(
+                    "DELETE FROM response_cache WHERE rowid IN "
+                    "(SELECT rowid FROM response_cache ORDER BY expires LIMIT ?)",
+                    (size - self.max_entries,)
+                )
+                self.evictions += size - self.max_entries
+
+    def invalidate_user(self, user_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM response_cache WHERE user_id = ?", (user_id,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM response_cache")
+
+    def stats(self):
+        size = self._connect().execute("SELECT count(*) FROM response_cache").fetchone()[0]
+        return {"backend": "sqlite", "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "size": size}
+
+
+class NullCache:
+    """Кэш выключен: всегда промах."""
+
+    def __init__(self):
+        self.misses = 0
+
+    def get(self, user_id, key):
+        self.misses += 1
+        return None
+
+    def set(self, user_id, key, value):
+        pass
+
+    def invalidate_user(self, user_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {"backend": "none", "hits": 0, "misses": self.misses, "evictions": 0, "size": 0}
+
+
+def make_cache(config):
+    """Создаёт кэш по настройкам RESPONSE_CACHE* из конфигурации приложения."""
+    backend = config.get("RESPONSE_CACHE", "memory")
+    ttl = config.get("RESPONSE_CACHE_TTL", 300)
+    size = config.get("RESPONSE_CACHE_SIZE", 1024)
+    if backend == "memory":
+        return MemoryCache(max_entries=size, ttl=ttl)
+    if backend == "sqlite":
+        return SQLiteCache(config["RESPONSE_CACHE_PATH"], max_entries=size, ttl=ttl)
+    return NullCache()
+
+
+def init_app(app):
+    app.extensions["response_cache"] = make_cache(app.config)
+
+
+def get_cache():
+    return current_app.extensions["response_cache"]
+
+
+def cached_per_user(view):
+    """Кэширует готовую страницу для текущего пользователя.
+
+    Сбрасывается через get_cache().invalidate_user() там, где меняются
+    тренировки или комментарии пользователя (services.py).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        cache = get_cache()
+        key = f"{view.__name__}:{request.full_path}"
+        page = cache.get(current_user.id, key)
+        if page is None:
+            page = view(*args, **kwargs)
+            if isinstance(page, str):  # редиректы и ответы об ошибках не кэшируем
+                cache.set(current_user.id, key, page)
+        return page
+    return wrapper
@@ -0,0 +1,153 @@
+"""Каталог упражнений: канонические названия и их написания.
+
+Тренировки и сводки хранят exercise_id, а не строку. Написание приводится
+к ключу (exercise_key): регистр, пробелы и ё не различаются, так что
+"Squat", "squat " и "SQUAT" — одно упражнение. Разные названия одного
+упражнения ("Присед" и "Squat") объединяет services.merge_exercises.
+
+Поиск ключ -> id и id -> название идёт по словарям в памяти процесса
+(ExerciseCatalog). Они загружаются из таблиц целиком и перечитываются
+при промахе и раз в EXERCISE_CATALOG_TTL секунд. Объединение удаляет
+упражнения, поэтому перед выдачей id раз за транзакцию сверяется
+CatalogVersion: после объединения в другом процессе (например,
+flask merge-exercises) словари сбрасываются сразу, и запись не ссылается
+на удалённое упражнение. Упражнения, созданные в ещё не
+закоммиченной транзакции, в общий словарь не попадают: до коммита они
+лежат в session.info и пропадают при откате.
+"""
+import threading
+import time
+
+from flask import current_app, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import db, Exercise, ExerciseAlias, CatalogVersion
+
+PENDING = "new_exercises"  # ключ в session.info: {ключ: (id, название)}
+CHECKED = "catalog_version_checked"  # ключ в session.info: версия уже сверена в этой транзакции
+
+
+def exercise_key(name):
+    """Ключ написания: без лишних пробелов, без регистра, ё = е."""
+    return " ".join((name or "").split()).casefold().replace("ё", "е")
+
+
+class ExerciseCatalog:
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._ids = {}  # ключ -> id
+        self._names = {}  # id -> название
+        self._version = None  # CatalogVersion, с которой загружены словари
+        self._expires = 0
+        self._lock = threading.Lock()
+
+    def exercise_id(self, name, create=True):
+        """id упражнения по любому написанию; неизвестное создаётся (create=False -> None)."""
+        key = exercise_key(name)
+        if not key:
+            return None
+        self._check_version()
+        exercise_id = self._get("_ids", key)
+        if exercise_id is not None:
+            return exercise_id
+        pending = db.session.info.get(PENDING, {})
+        if key in pending:
+            return pending[key][0]
+        exercise_id = self._reload_and_get("_ids", key)
+        if exercise_id is not None or not create:
+            return exercise_id
+
+        # ON CONFLICT: то же упражнение мог только что создать другой воркер
+        name = " ".join(name.split())
+        db.session.execute(sqlite_insert(Exercise).values(name=name).on_conflict_do_nothing())
+        exercise_id = db.session.execute(select(Exercise.id).where(Exercise.name == name)).scalar_one()
+        db.session.execute(sqlite_insert(ExerciseAlias).values(key=key, exercise_id=exercise_id)
+                           .on_conflict_do_nothing())
+        exercise_id = db.session.execute(
+            select(ExerciseAlias.exercise_id).where(ExerciseAlias.key == key)
+        ).scalar_one()
+        db.session.info.setdefault(PENDING, {})[key] = (exercise_id, name)
+        return exercise_id
+
+    def name(self, exercise_id):
+        if exercise_id is None:
+            return None
+        name = self._get("_names", exercise_id)
+        if name is not None:
+            return name
+        for pending_id, pending_name in db.session.info.get(PENDING, {}).values():
+            if pending_id == exercise_id:
+                return pending_name
+        return self._reload_and_get("_names", exercise_id)
+
+    def clear(self):
+        with self._lock:
+            self._ids, self._names, self._expires = {}, {}, 0
+
+    def _check_version(self):
+        if db.session.info.get(CHECKED):
+            return
+        version = current_version()
+        db.session.info[CHECKED] = True
+        if version != self._version:
+            self.clear()
+
+    def _get(self, mapping, key):
+        with self._lock:
+            if time.monotonic() < self._expires:
+                return getattr(self, mapping).get(key)
+        return None
+
+    def _reload_and_get(self, mapping, key):
+        # промах: упражнение могли добавить или объединить в другом воркере
+        self._load()
+        with self._lock:
+            return getattr(self, mapping).get(key)
+
+    def _load(self):
+        # свои незакоммиченные упражнения сессия тоже видит — их не кэшируем
+        pending_ids = {exercise_id for exercise_id, _ in db.session.info.get(PENDING, {}).values()}
+        ids = {key: exercise_id for key, exercise_id in db.session.execute(
+            select(ExerciseAlias.key, ExerciseAlias.exercise_id)) if exercise_id not in pending_ids}
+        names = {exercise_id: name for exercise_id, name in db.session.execute(
+            select(Exercise.id, Exercise.name)) if exercise_id not in pending_ids}
+        version = current_version()
+        with self._lock:
+            self._ids, self._names, self._version = ids, names, version
+            self._expires = time.monotonic() + self.ttl
+
+
+def current_version():
+    return db.session.execute(select(CatalogVersion.version)).scalar() or 0
+
+
+def bump_catalog_version():
+    """Вызывается в транзакции, которая удаляет или переназначает упражнения."""
+    stmt = sqlite_insert(CatalogVersion).values(id=1, version=1)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=['id'],
+                                                  set_={'version': CatalogVersion.version + 1}))
+
+
+@event.listens_for(Session, "after_transaction_end")
+def forget_pending(session, transaction):
+    # после коммита упражнения найдутся при перечитывании, после отката их нет
+    if transaction.parent is None:
+        session.info.pop(PENDING, None)
+        session.info.pop(CHECKED, None)
+
+
+@event.listens_for(Exercise.__table__, "after_create")
+def reset_catalog(target, connection, **kw):
+    # таблицу создали заново (тесты, новая база) — старые id недействительны
+    if has_app_context() and "exercise_catalog" in current_app.extensions:
+        get_catalog().clear()
+
+
+def init_app(app):
+    app.extensions["exercise_catalog"] = ExerciseCatalog(ttl=app.config["EXERCISE_CATALOG_TTL"])
+
+
+def get_catalog():
+    return current_app.extensions["exercise_catalog"]
@@ -0,0 +1,303 @@
+"""Команды flask: flask --app app <команда>."""
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import text, select, insert
+from sqlalchemy.schema import CreateTable
+
+import stats
+from catalog import get_catalog, exercise_key
+from models import (db, User, Exercise, ExerciseAlias, Workout, Comment, ExerciseStats, ExerciseWeek,
+                    create_search_index, rebuild_search_index)
+from services import import_workouts, assign_athlete, merge_exercises
+
+
+def init_db():
+    """Создаёт таблицы, админа и тренера."""
+    db.create_all()
+
+    # Админ
+    if not User.query.filter_by(username='admin').first():
+        admin_user = User(username='admin', role='admin')
+        admin_user.set_password('admin123')
+        db.session.add(admin_user)
+
+    # Тренер
+    if not User.query.filter_by(username='coach').first():
+        coach_user = User(username='coach', role='coach')
+        coach_user.set_password('coach123')  # пароль для тренера
+        db.session.add(coach_user)
+
+    db.session.commit()
+
+
+@click.command("init-db")
+@with_appcontext
+def init_db_command():
+    """flask --app app init-db"""
+    init_db()
+    print("База готова")
+
+
+@click.command("import-workouts")
+@click.argument("username")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--format", "fmt", type=click.Choice(["csv", "jsonl"]), default=None)
+@click.option("--batch-size", type=int, default=None)
+@with_appcontext
+def import_workouts_command(username, path, fmt, batch_size):
+    """flask --app app import-workouts USERNAME FILE"""
+    import importer
+
+    db.create_all()
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"Пользователь {username} не найден")
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        result = import_workouts(user.id, f, fmt or importer.detect_format(path), batch_size)
+    for line_no, message in result.errors:
+        print(f"строка {line_no}: {message}")
+    print(f"Импортировано: {result.imported}, ошибок: {result.error_count}")
+
+
+@click.command("assign-athletes")
+@click.argument("coach")
+@click.argument("athletes", nargs=-1)
+@click.option("--all", "assign_all", is_flag=True, help="закрепить всех спортсменов")
+@with_appcontext
+def assign_athletes_command(coach, athletes, assign_all):
+    """flask --app app assign-athletes COACH [USERNAME...] [--all]"""
+    db.create_all()
+    coach_user = User.query.filter_by(username=coach, role='coach').first()
+    if coach_user is None:
+        raise click.ClickException(f"Тренер {coach} не найден")
+    query = User.query.filter_by(role='user')
+    if not assign_all:
+        query = query.filter(User.username.in_(athletes))
+    users = query.all()
+    for user in users:
+        assign_athlete(coach_user.id, user.id)
+    print(f"Закреплено спортсменов: {len(users)}")
+
+
+@click.command("rebuild-rollups")
+@with_appcontext
+def rebuild_rollups_command():
+    """flask --app app rebuild-rollups"""
+    db.create_all()
+    stats.rebuild_rollups()
+    db.session.commit()
+    print("Сводные таблицы пересобраны")
+
+
+@click.command("rebuild-search")
+@with_appcontext
+def rebuild_search_command():
+    """flask --app app rebuild-search"""
+    db.create_all()
+    with db.engine.begin() as conn:
+        create_search_index(conn)
+        rebuild_search_index(conn)
+    print("Индекс поиска пересобран")
+
+
+@click.command("merge-exercises")
+@click.argument("name")
+@click.argument("aliases", nargs=-1, required=True)
+@with_appcontext
+def merge_exercises_command(name, aliases):
+    """flask --app app merge-exercises NAME ALIAS..."""
+    moved = merge_exercises(name, aliases)
+    print(f"Написания добавлены к «{name}», перенесено тренировок: {moved}")
+
+
+@click.command("migrate-exercises")
+@with_appcontext
+def migrate_exercises_command():
+    """flask --app app migrate-exercises"""
+    if migrate_exercises():
+        print("Упражнения перенесены в каталог, сводки пересобраны")
+    else:
+        print("Тренировки уже ссылаются на каталог упражнений")
+
+
+@click.command("migrate-dates")
+@with_appcontext
+def migrate_dates_command():
+    """flask --app app migrate-dates"""
+    migrate_dates()
+    print("Даты тренировок и комментариев переведены в DATE, индексы созданы")
+
+
+def register_commands(app):
+    for command in (init_db_command, import_workouts_command, assign_athletes_command,
+                    rebuild_rollups_command, rebuild_search_command, merge_exercises_command,
+                    migrate_exercises_command, migrate_dates_command):
+        app.cli.add_command(command)
+
+
+def without_foreign_keys(migrate):
+    """Выполняет migrate(conn) одной транзакцией с выключенными внешними ключами.
+
+    При включённых внешних ключах DROP TABLE workout удалил бы комментарии.
+    """
+    with db.engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+        conn.commit()
+        with conn.begin():
+            result = migrate(conn)
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+        conn.commit()
+    return result
+
+
+# ---------- Миграция упражнений в каталог ----------
+def migrate_exercises():
+    """Переводит строковую колонку workout.exercise на каталог упражнений.
+
+    Возвращает False, если переводить нечего.
+    """
+    db.create_all()
+    if not without_foreign_keys(migrate_exercise_column):
+        return False
+    stats.rebuild_rollups()
+    db.session.commit()
+    return True
+
+
+def migrate_exercise_column(conn):
+    """Заполняет каталог написаниями из workout.exercise, ставит exercise_id и удаляет строковую колонку.
+
+    Написания с одинаковым ключом (регистр, пробелы, ё) становятся одним
+    упражнением с названием самого частого из них. Сводки по упражнениям
+    пересоздаются пустыми — их надо пересобрать (stats.rebuild_rollups).
+    """
+    columns = {row.name for row in conn.execute(text("PRAGMA table_info(workout)"))}
+    if 'exercise' not in columns:
+        return False
+    if 'exercise_id' not in columns:
+        conn.execute(text("ALTER TABLE workout ADD COLUMN exercise_id INTEGER REFERENCES exercise (id)"))
+
+    variants = {}
+    for spelling, count in conn.execute(text(
+            "SELECT exercise, count(*) FROM workout WHERE exercise IS NOT NULL GROUP BY exercise")):
+        key = exercise_key(spelling)
+        if key:
+            variants.setdefault(key, []).append((-count, spelling))
+    known = dict(conn.execute(select(ExerciseAlias.key, ExerciseAlias.exercise_id)).all())
+    spellings = []
+    for key, items in variants.items():
+        exercise_id = known.get(key)
+        if exercise_id is None:
+            name = " ".join(min(items)[1].split())  # самое частое написание
+            exercise_id = conn.execute(insert(Exercise).values(name=name)).inserted_primary_key[0]
+            conn.execute(insert(ExerciseAlias).values(key=key, exercise_id=exercise_id))
+        spellings.extend({"spelling": spelling, "exercise_id": exercise_id} for _, spelling in items)
+
+    # одно обновление по временной таблице вместо UPDATE на каждое написание
+    conn.execute(text("CREATE TEMP TABLE exercise_spelling (spelling TEXT PRIMARY KEY, exercise_id INTEGER)"))
+    if spellings:
+        conn.execute(text("INSERT INTO exercise_spelling VALUES (:spelling, :exercise_id)"), spellings)
+    conn.execute(text("UPDATE workout SET exercise_id = s.exercise_id FROM exercise_spelling s "
+                      "WHERE workout.exercise = s.spelling"))
+    conn.execute(text("DROP TABLE exercise_spelling"))
+
+    # колонку нельзя удалить, пока на неё ссылаются индекс и триггеры поиска
+    for trigger in ("workout_search_insert", "workout_search_update"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_workout_user_exercise_date"))
+    conn.execute(text("ALTER TABLE workout DROP COLUMN exercise"))
+    for index in Workout.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+    for table in (ExerciseStats.__table__, ExerciseWeek.__table__):
+        table.drop(conn)
+        table.create(conn)
+    create_search_index(conn)
+    rebuild_search_index(conn)
+    get_catalog().clear()
+    return True
+
+
+# ---------- Миграция дат ----------
+LEGACY_DATE_FORMATS = ("%Y-%m-%d", "%d.%m.%Y", "%Y/%m/%d", "%d/%m/%Y")
+
+
+def parse_legacy_date(value):
+    """Дата из старой строковой колонки в 'YYYY-MM-DD'; нераспознанная строка -> None."""
+    for fmt in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).date().isoformat()
+        except ValueError:
+            pass
+    return None
+
+
+def legacy_dates(conn, table_name):
+    """Строки со старыми датами не в формате 'YYYY-MM-DD': [(id, дата)]."""
+    return conn.execute(text(
+        f"SELECT id, date FROM {table_name} WHERE date IS NOT NULL "
+        f"AND date NOT GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'"
+    )).all()
+
+
+def unparsed_dates():
+    """Даты, которые parse_legacy_date не распознаёт: [(таблица, id, дата)]."""
+    with db.engine.connect() as conn:
+        return [(table.name, row.id, row.date)
+                for table in (Workout.__table__, Comment.__table__)
+                for row in legacy_dates(conn, table.name) if parse_legacy_date(row.date) is None]
+
+
+def migrate_dates():
+    """Переводит workout.date и comment.date из VARCHAR в DATE и создаёт индексы.
+
+    Даты в других форматах приводятся к 'YYYY-MM-DD' одним executemany,
+    таблица пересоздаётся с новой схемой и копируется одним INSERT ... SELECT.
+    Если есть нераспознанные даты, ничего не меняется: их нужно исправить
+    вручную, иначе дата потерялась бы.
+    """
+    db.create_all()
+    unparsed = unparsed_dates()
+    if unparsed:
+        listed = "\n".join(f"  {table} id={row_id}: {value!r}" for table, row_id, value in unparsed[:50])
+        more = f"\n  … и ещё {len(unparsed) - 50}" if len(unparsed) > 50 else ""
+        raise click.ClickException(
+            f"Нераспознанные даты ({len(unparsed)}), исправьте их и запустите снова:\n{listed}{more}")
+
+    def migrate(conn):
+        # строковые упражнения переносятся раньше, иначе пересоздание таблицы их потеряет
+        exercises_migrated = migrate_exercise_column(conn)
+        migrate_date_tables(conn)
+        # триггеры поиска удалились вместе со старыми таблицами
+        create_search_index(conn)
+        rebuild_search_index(conn)
+        return exercises_migrated
+
+    if without_foreign_keys(migrate):
+        stats.rebuild_rollups()
+        db.session.commit()
+
+
+def migrate_date_tables(conn):
+    """Нормализует даты и пересоздаёт таблицы тренировок и комментариев с новой схемой."""
+    for table in (Workout.__table__, Comment.__table__):
+        rows = legacy_dates(conn, table.name)
+        if rows:
+            conn.execute(text(f"UPDATE {table.name} SET date = :date WHERE id = :id"),
+                         [{"id": row.id, "date": parse_legacy_date(row.date)} for row in rows])
+
+        columns = {row.name: row.type for row in conn.execute(text(f"PRAGMA table_info({table.name})"))}
+        if columns.get('date', '').upper() != 'DATE':
+            # SQLite не умеет менять тип колонки — пересоздаём таблицу
+            new_name = f"{table.name}_new"
+            ddl = str(CreateTable(table).compile(conn))
+            conn.execute(text(ddl.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {new_name} ", 1)))
+            copied = ", ".join(c.name for c in table.columns if c.name in columns)
+            conn.execute(text(f"INSERT INTO {new_name} ({copied}) SELECT {copied} FROM {table.name}"))
+            conn.execute(text(f"DROP TABLE {table.name}"))
+            conn.execute(text(f"ALTER TABLE {new_name} RENAME TO {table.name}"))
+
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
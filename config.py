@@ -1,4 +1,65 @@
 class Config:
-    SECRET_KEY = "exam_key"
-    SQLALCHEMY_DATABASE_URI = "sqlite:///training_diary.db"
+    SECRET_KEY = "secret123"  # можно поменять
+    SQLALCHEMY_DATABASE_URI = "sqlite:///training_new.db"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # выполняются на каждом новом соединении с SQLite, по порядку
+    SQLITE_PRAGMAS = {
+        "foreign_keys": "ON",  # иначе не проверяются внешние ключи и ON DELETE CASCADE
+        "busy_timeout": 5000,  # мс ждать чужую запись вместо ошибки 'database is locked'
+        "journal_mode": "WAL",  # читатели не ждут писателя, писатель не ждёт читателей
+        "synchronous": "NORMAL",  # в режиме WAL fsync только на checkpoint
+        "mmap_size": 256 * 1024 * 1024,  # чтение базы через отображение в память
+    }
+
+    WORKOUTS_PER_PAGE = 50  # размер страницы на дашборде и у тренера
+    ASSET_MAX_AGE = 365 * 24 * 3600  # /assets/ с отпечатком в имени (assets.py)
+    PROGRESS_MAX_POINTS = 120  # точек на упражнение на странице прогресса
+    STATS_MAX_BUCKETS = 1000  # периодов (и дней календаря) в одном запросе статистики
+    HEATMAP_DAYS = 365  # тепловая карта на /statistics — за последние дни выбранного диапазона
+
+    # кэш страниц: 'memory', 'sqlite' (общий для нескольких воркеров) или None
+    RESPONSE_CACHE = "memory"
+    RESPONSE_CACHE_SIZE = 1024
+    RESPONSE_CACHE_TTL = 300  # секунд
+    RESPONSE_CACHE_PATH = "response_cache.db"
+
+    IMPORT_BATCH_SIZE = 1000  # строк в одной транзакции импорта
+
+    # через сколько секунд воркер перечитывает каталог упражнений (catalog.py)
+    EXERCISE_CATALOG_TTL = 300
+
+    # лента изменений для тренера (/coach/feed, /coach/feed/stream)
+    FEED_POLL_INTERVAL = 1.0  # секунд между проверками новых записей
+    FEED_LONG_POLL_TIMEOUT = 25  # секунд ожидания в /coach/feed
+    FEED_STREAM_SECONDS = 300  # после этого поток SSE закрывается, браузер переподключается
+    FEED_BATCH_SIZE = 200  # записей за один ответ или событие
+    COACH_COMMENTS_MAX = 500  # комментариев в одном запросе /coach/comments
+
+    # метрики запросов и SQL (metrics.py, /admin/metrics)
+    METRICS_ENABLED = False
+    METRICS_TOKEN = None  # токен для сборщика: Authorization: Bearer <токен>
+    SLOW_REQUEST_MS = 500  # такие запросы пишутся в лог
+    SLOW_QUERY_MS = 100
+
+    # алгоритм и стоимость хэша паролей в формате werkzeug, например
+    # 'scrypt:32768:8:1' или 'pbkdf2:sha256:600000'; подбирать по benchmarks/login_throughput.py
+    PASSWORD_HASH_METHOD = "scrypt:32768:8:1"
+
+    # вошедшие пользователи в памяти воркера (principals.py): сколько и на сколько секунд
+    LOGIN_CACHE_SIZE = 4096
+    LOGIN_CACHE_TTL = 60
+
+    # пользователей с большей историей админ удаляет в фоне, пачками
+    BACKGROUND_PURGE_THRESHOLD = 20000  # тренировок
+    PURGE_BATCH_SIZE = 5000
+
+
+class ProductionConfig(Config):
+    """Настройки для wsgi.py: несколько воркеров, в каждом несколько потоков."""
+    # соединений в пуле воркера — не меньше числа его потоков
+    SQLALCHEMY_ENGINE_OPTIONS = {"pool_size": 8, "max_overflow": 4, "pool_timeout": 10}
+
+    # кэш страниц в памяти у каждого воркера свой и не узнаёт о записях
+    # в соседних воркерах, поэтому кэш общий, в файле
+    RESPONSE_CACHE = "sqlite"
@@ -0,0 +1,56 @@
+"""Потоковая выгрузка истории тренировок (CSV и JSON Lines, по желанию gzip).
+
+Все функции — генераторы: на вход идут записи (тренировка, комментарии)
+по одной, на выход — куски текста/байт для потокового ответа Flask.
+CSV совместим с импортом (importer.py): лишний столбец comments он пропускает.
+"""
+import csv
+import io
+import json
+import zlib
+
+CSV_FIELDS = ("date", "exercise", "sets", "reps", "weight", "comments")
+CHUNK_SIZE = 64 * 1024
+
+
+def csv_lines(records):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    for workout, comments in records:
+        writer.writerow([workout["date"], workout["exercise"], workout["sets"], workout["reps"],
+                         workout["weight"], "\n".join(c["content"] for c in comments)])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def jsonl_lines(records):
+    for workout, comments in records:
+        yield json.dumps(dict(workout, comments=comments), ensure_ascii=False) + "\n"
+
+
+def chunked(lines, size=CHUNK_SIZE):
+    """Склеивает мелкие строки в куски ~size байт, чтобы не писать в сокет по строчке."""
+    parts = []
+    length = 0
+    for line in lines:
+        data = line.encode("utf-8")
+        parts.append(data)
+        length += len(data)
+        if length >= size:
+            yield b"".join(parts)
+            parts = []
+            length = 0
+    if parts:
+        yield b"".join(parts)
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 = формат gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
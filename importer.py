@@ -0,0 +1,95 @@
+"""Потоковый разбор файлов импорта тренировок (CSV и JSON Lines).
+
+Файл читается построчно, поэтому память не зависит от его размера.
+Запись в базу — в services.import_workouts пачками по IMPORT_BATCH_SIZE строк.
+"""
+import csv
+import json
+import math
+from datetime import date
+
+FIELDS = ("date", "exercise", "sets", "reps", "weight")
+MAX_REPORTED_ERRORS = 100  # больше ошибок не храним, только считаем
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []  # (номер строки, сообщение)
+
+    def add_error(self, line_no, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_no, message))
+
+
+def detect_format(filename):
+    """'csv' или 'jsonl' по расширению файла."""
+    name = (filename or "").lower()
+    if name.endswith((".jsonl", ".ndjson", ".json")):
+        return "jsonl"
+    return "csv"
+
+
+def read_rows(stream, fmt):
+    """Генератор (номер строки, словарь) из текстового потока."""
+    if fmt == "jsonl":
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_no, None
+                continue
+            yield line_no, row if isinstance(row, dict) else None
+    else:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # номер строки в файле с учётом заголовка
+            yield reader.line_num, row
+
+
+def whole_number(value):
+    """Целое из строки или числа JSON; 2.9 и true — ValueError, а не 2 и 1."""
+    if isinstance(value, bool):
+        raise ValueError
+    if isinstance(value, float):
+        if not value.is_integer():
+            raise ValueError
+        return int(value)
+    return int(value) if isinstance(value, int) else int(str(value).strip())
+
+
+def parse_row(row):
+    """Проверяет строку и приводит типы; при ошибке ValueError с описанием."""
+    if row is None:
+        raise ValueError("строка не разобрана")
+    missing = [field for field in FIELDS if row.get(field) in (None, "")]
+    if missing:
+        raise ValueError("нет полей: " + ", ".join(missing))
+
+    try:
+        day = date.fromisoformat(str(row["date"]).strip())
+    except ValueError:
+        raise ValueError("дата должна быть в формате YYYY-MM-DD")
+    exercise = str(row["exercise"]).strip()
+    if not exercise or len(exercise) > 100:
+        raise ValueError("название упражнения пустое или длиннее 100 символов")
+    try:
+        sets = whole_number(row["sets"])
+        reps = whole_number(row["reps"])
+        if isinstance(row["weight"], bool):
+            raise ValueError
+        weight = float(row["weight"])
+    except (TypeError, ValueError):
+        raise ValueError("подходы и повторения — целые числа, вес — число")
+    if not math.isfinite(weight):
+        raise ValueError("вес должен быть конечным числом")
+    if sets <= 0 or reps <= 0:
+        raise ValueError("подходы и повторения должны быть больше нуля")
+    if weight < 0:
+        raise ValueError("вес не может быть отрицательным")
+
+    return {"date": day, "exercise": exercise, "sets": sets, "reps": reps, "weight": weight}
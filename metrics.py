@@ -0,0 +1,148 @@
+"""Метрики запросов: время ответа, число и время SQL-запросов по маршрутам.
+
+Включается настройкой METRICS_ENABLED. Тогда:
+- на каждый запрос считаются время ответа, число SQL-запросов и их время
+  (события SQLAlchemy before/after_cursor_execute), ответ получает
+  заголовок Server-Timing;
+- запросы дольше SLOW_REQUEST_MS и SQL дольше SLOW_QUERY_MS пишутся в лог;
+- /admin/metrics отдаёт гистограммы в текстовом формате Prometheus.
+
+Метрики хранятся в памяти процесса: при нескольких воркерах каждый
+отдаёт свои, Prometheus суммирует их по меткам.
+"""
+import threading
+import time
+
+from flask import g, request, has_app_context
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class Histogram:
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self._series = {}  # метки -> [счётчики по корзинам..., сумма, количество]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+        for labels, series in items:
+            label_text = format_labels(labels)
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_text},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{label_text}}} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, value=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            label_text = f"{{{format_labels(labels)}}}" if labels else ""
+            lines.append(f"{self.name}{label_text} {value}")
+        return lines
+
+
+def format_labels(labels):
+    # labels — кортеж пар (имя, значение)
+    return ",".join(f'{name}="{value}"' for name, value in labels)
+
+
+class Metrics:
+    def __init__(self):
+        self.latency = Histogram("http_request_duration_seconds",
+                                 "Время ответа по маршрутам", LATENCY_BUCKETS)
+        self.queries = Histogram("http_request_sql_queries",
+                                 "Число SQL-запросов на один HTTP-запрос", QUERY_BUCKETS)
+        self.sql_time = Counter("http_request_sql_seconds_total", "Суммарное время SQL по маршрутам")
+        self.slow_queries = Counter("sql_slow_queries_total", "SQL-запросы дольше SLOW_QUERY_MS")
+
+    def render(self):
+        lines = []
+        for metric in (self.latency, self.queries, self.sql_time, self.slow_queries):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def init_app(app):
+    if not app.config["METRICS_ENABLED"]:
+        return
+    from models import db
+
+    metrics = app.extensions["metrics"] = Metrics()
+    slow_query = app.config["SLOW_QUERY_MS"] / 1000
+    slow_request = app.config["SLOW_REQUEST_MS"] / 1000
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        # запросы вне HTTP-запроса (команды, фоновое удаление) не учитываются
+        if has_app_context() and "sql_queries" in g:
+            g.sql_queries += 1
+            g.sql_time += elapsed
+        if elapsed >= slow_query:
+            metrics.slow_queries.inc(())
+            app.logger.warning("Медленный SQL (%.1f мс): %s", elapsed * 1000, " ".join(statement.split()))
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+        g.sql_queries = 0
+        g.sql_time = 0.0
+
+    @app.after_request
+    def record_request(response):
+        if "request_started" not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_started
+        endpoint = request.url_rule.endpoint if request.url_rule else "not_found"
+        labels = (("endpoint", endpoint), ("method", request.method))
+        metrics.latency.observe(labels, elapsed)
+        metrics.queries.observe((("endpoint", endpoint),), g.sql_queries)
+        metrics.sql_time.inc((("endpoint", endpoint),), g.sql_time)
+        if elapsed >= slow_request:
+            app.logger.warning("Медленный запрос %s %s: %.1f мс, SQL: %d за %.1f мс",
+                               request.method, request.full_path, elapsed * 1000,
+                               g.sql_queries, g.sql_time * 1000)
+        response.headers["Server-Timing"] = (f'app;dur={elapsed * 1000:.1f}, '
+                                             f'db;dur={g.sql_time * 1000:.1f};desc="{g.sql_queries} queries"')
+        return response
@@ -1,20 +1,326 @@
+import hashlib
+from datetime import date, datetime
+from functools import lru_cache, partial
+
+from flask import current_app
 from flask_login import UserMixin
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, select
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import validates
+from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
 
-class User(db.Model, UserMixin):
+def init_app(app):
+    """Подключает db к приложению; каждое новое соединение SQLite получает SQLITE_PRAGMAS."""
+    db.init_app(app)
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", partial(set_sqlite_pragmas, app.config["SQLITE_PRAGMAS"]))
+
+
+def set_sqlite_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def hash_method(password_hash):
+    """Часть хэша до соли: алгоритм и его параметры."""
+    return password_hash.split('$', 1)[0] if password_hash else None
+
+
+def password_version(password_hash):
+    """Короткий отпечаток хэша пароля: меняется при каждой смене пароля (новая соль)."""
+    return hashlib.sha1(password_hash.encode()).hexdigest()[:8]
+
+
+@lru_cache(maxsize=8)
+def normalized_hash_method(method):
+    # werkzeug дописывает параметры по умолчанию ('pbkdf2' -> 'pbkdf2:sha256:1000000'),
+    # поэтому сравниваем с тем, что он реально записывает
+    return hash_method(generate_password_hash('', method=method))
+
+
+def to_date(value):
+    """Дата из строки 'YYYY-MM-DD' (так её присылает <input type=date>)."""
+    if isinstance(value, str):
+        return date.fromisoformat(value) if value else None
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(50), unique=True, nullable=False)
-    password = db.Column(db.String(100), nullable=False)
+    username = db.Column(db.String(150), unique=True, nullable=False)
+    password_hash = db.Column(db.String(200), nullable=False)
+    role = db.Column(db.String(20), default='user')  # 'user', 'coach' или 'admin'
+
+    workouts = db.relationship('Workout', back_populates='user', order_by='Workout.date',
+                               cascade='all')
+    written_comments = db.relationship('Comment', back_populates='coach', cascade='all')
+
+    def set_password(self, password):
+        self.password_hash = generate_password_hash(password, method=current_app.config['PASSWORD_HASH_METHOD'])
+
+    def check_password(self, password):
+        return check_password_hash(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        return hash_method(self.password_hash) != normalized_hash_method(current_app.config['PASSWORD_HASH_METHOD'])
+
+    def get_id(self):
+        # идентификатор в сессии, см. principals.py
+        return f"{self.id}:{password_version(self.password_hash)}"
+
+
+class CoachAthlete(db.Model):
+    """Какие спортсмены закреплены за тренером.
+
+    Первичный ключ (coach_id, athlete_id) — индекс для ростера тренера,
+    отдельный индекс по athlete_id — для поиска тренеров спортсмена.
+    """
+    coach_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    athlete_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True,
+                           index=True)
 
 
-class Workout(db.Model):
+class Exercise(db.Model):
+    """Упражнение из каталога (см. catalog.py). AUTOINCREMENT: id объединённых упражнений не переиспользуются."""
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)  # каноническое название
+
+
+class ExerciseAlias(db.Model):
+    """Написание упражнения: ключ catalog.exercise_key -> упражнение."""
+    key = db.Column(db.String(100), primary_key=True)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercise.id', ondelete='CASCADE'), nullable=False,
+                            index=True)
+
+
+class ExerciseName:
+    """Название упражнения по exercise_id: у объекта — из каталога в памяти, в запросе — подзапрос.
+
+    Присваивание названия находит (или создаёт) упражнение в каталоге.
+    """
+    @hybrid_property
+    def exercise(self):
+        from catalog import get_catalog
+
+        return get_catalog().name(self.exercise_id)
+
+    @exercise.inplace.setter
+    def _exercise_setter(self, name):
+        from catalog import get_catalog
+
+        self.exercise_id = get_catalog().exercise_id(name)
+
+    @exercise.inplace.expression
+    @classmethod
+    def _exercise_expression(cls):
+        return select(Exercise.name).where(Exercise.id == cls.exercise_id).scalar_subquery()
+
+
+class Workout(ExerciseName, db.Model):
+    __table_args__ = (
+        db.Index('ix_workout_user_date', 'user_id', 'date'),
+        db.Index('ix_workout_user_exercise_date', 'user_id', 'exercise_id', 'date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.String(20))
-    exercise = db.Column(db.String(100))
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'))
+    date = db.Column(db.Date)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercise.id'))
     sets = db.Column(db.Integer)
     reps = db.Column(db.Integer)
     weight = db.Column(db.Float)
-    user_id = db.Column(db.Integer, db.ForeignKey("user.id"))
+
+    user = db.relationship('User', back_populates='workouts')
+    comments = db.relationship('Comment', back_populates='workout', order_by='Comment.id',
+                               cascade='all')
+
+    @validates('date')
+    def validate_date(self, key, value):
+        return to_date(value)
+
+
+class Comment(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    workout_id = db.Column(db.Integer, db.ForeignKey('workout.id', ondelete='CASCADE'), index=True)
+    coach_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), index=True)  # тренер
+    content = db.Column(db.String(500))
+    date = db.Column(db.Date)
+
+    workout = db.relationship('Workout', back_populates='comments')
+    coach = db.relationship('User', back_populates='written_comments')
+
+    @validates('date')
+    def validate_date(self, key, value):
+        return to_date(value)
+
+
+# ---------- Полнотекстовый поиск (FTS5, см. services.search_workouts) ----------
+# Строка индекса на тренировку: rowid = workout.id, owner = 'u<id пользователя>'
+# (фильтр по владельцу тоже идёт по индексу), exercise — все написания упражнения
+# из каталога, comments — все комментарии к ней. Индекс держат в актуальном
+# состоянии триггеры. Токенизатор unicode61 не считает ё вариантом е, поэтому
+# ё приводится к е и здесь, и в запросе.
+def fold_yo(expr):
+    return f"replace(replace({expr}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def exercise_text(exercise_id):
+    # ключи написаний уже без ё (catalog.exercise_key)
+    return (f"coalesce((SELECT group_concat(key, ' ') FROM exercise_alias "
+            f"WHERE exercise_id = {exercise_id}), '')")
+
+
+def comments_text(workout_id):
+    concat = f"(SELECT group_concat(content, ' ') FROM comment WHERE workout_id = {workout_id})"
+    return f"coalesce({fold_yo(concat)}, '')"
+
+
+SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS workout_search "
+    "USING fts5(owner, exercise, comments, tokenize = 'unicode61 remove_diacritics 2')",
+
+    f"""CREATE TRIGGER IF NOT EXISTS workout_search_insert AFTER INSERT ON workout BEGIN
+        INSERT INTO workout_search (rowid, owner, exercise, comments)
+        VALUES (new.id, 'u' || new.user_id, {exercise_text('new.exercise_id')}, '');
+    END""",
+
+    f"""CREATE TRIGGER IF NOT EXISTS workout_search_update AFTER UPDATE OF user_id, exercise_id ON workout BEGIN
+        UPDATE workout_search SET owner = 'u' || new.user_id, exercise = {exercise_text('new.exercise_id')}
+        WHERE rowid = new.id;
+    END""",
+
+    """CREATE TRIGGER IF NOT EXISTS workout_search_delete AFTER DELETE ON workout BEGIN
+        DELETE FROM workout_search WHERE rowid = old.id;
+    END""",
+
+    f"""CREATE TRIGGER IF NOT EXISTS comment_search_insert AFTER INSERT ON comment BEGIN
+        UPDATE workout_search SET comments = {comments_text('new.workout_id')} WHERE rowid = new.workout_id;
+    END""",
+
+    f"""CREATE TRIGGER IF NOT EXISTS comment_search_update AFTER UPDATE OF workout_id, content ON comment BEGIN
+        UPDATE workout_search SET comments = {comments_text('old.workout_id')} WHERE rowid = old.workout_id;
+        UPDATE workout_search SET comments = {comments_text('new.workout_id')} WHERE rowid = new.workout_id;
+    END""",
+
+    f"""CREATE TRIGGER IF NOT EXISTS comment_search_delete AFTER DELETE ON comment BEGIN
+        UPDATE workout_search SET comments = {comments_text('old.workout_id')} WHERE rowid = old.workout_id;
+    END""",
+]
+
+
+def create_search_index(connection):
+    """Создаёт индекс поиска и триггеры, если их нет; новый индекс заполняется из таблиц."""
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'workout_search'"
+    ).first()
+    for ddl in SEARCH_DDL:
+        connection.exec_driver_sql(ddl)
+    if not exists:
+        rebuild_search_index(connection)
+
+
+def rebuild_search_index(connection):
+    """Заполняет индекс поиска заново по всем тренировкам и комментариям."""
+    connection.exec_driver_sql("DELETE FROM workout_search")
+    connection.exec_driver_sql(
+        "INSERT INTO workout_search (rowid, owner, exercise, comments) "
+        f"SELECT id, 'u' || user_id, {exercise_text('workout.exercise_id')}, {comments_text('workout.id')} "
+        "FROM workout"
+    )
+
+
+def reindex_exercise_search(connection, exercise_id):
+    """Обновляет написания упражнения в индексе поиска (после объединения упражнений)."""
+    connection.exec_driver_sql(
+        f"UPDATE workout_search SET exercise = {exercise_text('?')} "
+        "WHERE rowid IN (SELECT id FROM workout WHERE exercise_id = ?)", (exercise_id, exercise_id)
+    )
+
+
+# create_all/drop_all создают и удаляют индекс вместе с таблицей комментариев
+event.listen(Comment.__table__, "after_create",
+             lambda target, connection, **kw: create_search_index(connection))
+event.listen(Comment.__table__, "before_drop",
+             lambda target, connection, **kw: connection.exec_driver_sql("DROP TABLE IF EXISTS workout_search"))
+
+
+# ---------- Сводные таблицы (обновляются вместе с тренировками, см. stats.py) ----------
+class MonthlyVolume(db.Model):
+    """Число тренировок и объём пользователя за месяц."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    workouts = db.Column(db.Integer, nullable=False, default=0)
+    volume = db.Column(db.Float, nullable=False, default=0)
+
+
+class ExerciseStats(ExerciseName, db.Model):
+    """Итоги пользователя по упражнению: количество, объём, лучший и последний вес."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    exercise_id = db.Column(db.Integer, primary_key=True)
+    workouts = db.Column(db.Integer, nullable=False, default=0)
+    volume = db.Column(db.Float, nullable=False, default=0)
+    best_weight = db.Column(db.Float)
+    last_weight = db.Column(db.Float)
+    last_date = db.Column(db.Date)
+    last_workout_id = db.Column(db.Integer)
+
+
+class ExerciseWeek(ExerciseName, db.Model):
+    """Лучший вес и оценка 1ПМ по упражнению за неделю — точки графика прогресса.
+
+    week — понедельник недели.
+    """
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), primary_key=True)
+    exercise_id = db.Column(db.Integer, primary_key=True)
+    week = db.Column(db.Date, primary_key=True)
+    workouts = db.Column(db.Integer, nullable=False, default=0)
+    best_weight = db.Column(db.Float)
+    best_e1rm = db.Column(db.Float)
+
+
+class ChangeLog(db.Model):
+    """Журнал изменений тренировок и комментариев для ленты тренера.
+
+    Записи только добавляются, id — курсор ленты (AUTOINCREMENT, чтобы id
+    не переиспользовались после удаления). Без внешних ключей: запись
+    остаётся после удаления тренировки.
+    """
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)  # спортсмен
+    kind = db.Column(db.String(20), nullable=False)  # см. services.log_change
+    workout_id = db.Column(db.Integer)
+    comment_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+
+class CatalogVersion(db.Model):
+    """Версия каталога упражнений (одна строка): растёт при объединении
+    упражнений, по ней воркеры сбрасывают свои словари (catalog.py)."""
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+
+class DataVersion(db.Model):
+    """Счётчик изменений данных пользователя (для ETag в API).
+
+    Без внешнего ключа: строка переживает удаление пользователя, чтобы
+    новый владелец того же id не получил старые ETag.
+    """
+    user_id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
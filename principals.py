@@ -0,0 +1,112 @@
+"""Кэш пользователей для Flask-Login.
+
+user_loader вызывается на каждый запрос с сессией. Вместо ORM-объекта User
+он отдаёт компактный Principal (id, имя, роль, версия пароля) из LRU в
+памяти процесса, так что запрос не ходит в базу за пользователем.
+
+Идентификатор в сессии — "<id>:<версия пароля>" (User.get_id): после смены
+пароля или удаления пользователя (id может достаться новому) старые сессии
+не подходят. Запись сбрасывается invalidate_principal() там, где меняются
+роль или пароль и где пользователь удаляется; другие воркеры увидят
+изменение через LOGIN_CACHE_TTL секунд.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from sqlalchemy import select
+
+from models import db, User, password_version
+
+
+class Principal:
+    """Вошедший пользователь: то, что нужно проверкам доступа, без ORM."""
+    __slots__ = ("id", "username", "role", "password_version")
+
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
+    def __init__(self, id, username, role, password_version):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.password_version = password_version
+
+    def get_id(self):
+        return f"{self.id}:{self.password_version}"
+
+
+class PrincipalCache:
+    def __init__(self, max_entries=4096, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user_id -> (expires, Principal)
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(user_id, None)
+                return None
+            self._entries.move_to_end(user_id)
+            return entry[1]
+
+    def set(self, user_id, principal):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, principal)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def load_principal(session_id):
+    """Principal по идентификатору из сессии; None — сессия недействительна."""
+    user_id, _, version = session_id.partition(":")
+    try:
+        user_id = int(user_id)
+    except ValueError:
+        return None
+    principal = get_principals().get(user_id)
+    # другая версия — пароль сменили или id занял новый пользователь в другом воркере: читаем из базы
+    if principal is None or (version and version != principal.password_version):
+        principal = fetch_principal(user_id)
+    # сессии, созданные до появления версии, содержат только id
+    if principal is None or (version and version != principal.password_version):
+        return None
+    return principal
+
+
+def fetch_principal(user_id):
+    row = db.session.execute(
+        select(User.id, User.username, User.role, User.password_hash).where(User.id == user_id)
+    ).first()
+    if row is None:
+        get_principals().invalidate(user_id)
+        return None
+    principal = Principal(row.id, row.username, row.role, password_version(row.password_hash))
+    get_principals().set(user_id, principal)
+    return principal
+
+
+def init_app(app):
+    app.extensions["principals"] = PrincipalCache(max_entries=app.config["LOGIN_CACHE_SIZE"],
+                                                  ttl=app.config["LOGIN_CACHE_TTL"])
+
+
+def get_principals():
+    return current_app.extensions["principals"]
+
+
+def invalidate_principal(user_id):
+    get_principals().invalidate(user_id)
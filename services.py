@@ -0,0 +1,609 @@
+"""Операции над тренировками, общие для страниц, API и команд.
+
+Каждая запись сразу обновляет сводные таблицы, версию данных пользователя
+(ETag в API) и сбрасывает его кэш страниц.
+"""
+import csv
+import re
+import threading
+from datetime import date
+
+from flask import current_app
+from sqlalchemy import func, tuple_, or_, delete, select, insert, update, table, column, literal_column
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import selectinload
+
+import stats
+from cache import get_cache
+from catalog import get_catalog, exercise_key, bump_catalog_version
+from principals import invalidate_principal
+from models import (db, User, CoachAthlete, Exercise, ExerciseAlias, Workout, Comment, MonthlyVolume,
+                    ExerciseStats, ExerciseWeek, ChangeLog, DataVersion, reindex_exercise_search)
+
+
+def bump_data_version(user_id):
+    stmt = sqlite_insert(DataVersion).values(user_id=user_id, version=1)
+    stmt = stmt.on_conflict_do_update(index_elements=['user_id'],
+                                      set_={'version': DataVersion.version + 1})
+    db.session.execute(stmt)
+
+
+def data_version(user_id):
+    version = db.session.execute(
+        select(DataVersion.version).where(DataVersion.user_id == user_id)
+    ).scalar()
+    return version or 0
+
+
+def log_change(user_id, kind, workout_id=None, comment_id=None):
+    """Запись в журнал для ленты тренера, в той же транзакции, что и изменение.
+
+    kind: workout_added, workout_updated, workout_deleted, comment_added,
+    workouts_imported (одна запись на весь импорт).
+    """
+    db.session.add(ChangeLog(user_id=user_id, kind=kind, workout_id=workout_id, comment_id=comment_id))
+
+
+def register_user(username, password, role="user"):
+    if User.query.filter_by(username=username).first():
+        return None  # пользователь уже есть
+    user = User(username=username, role=role)
+    user.set_password(password)
+    db.session.add(user)
+    db.session.commit()
+    # id удалённого пользователя может достаться новому
+    get_cache().invalidate_user(user.id)
+    invalidate_principal(user.id)
+    return user
+
+
+def create_workout(user_id, date, exercise, sets, reps, weight):
+    workout = Workout(
+        user_id=user_id,
+        date=date,
+        exercise=exercise,
+        sets=sets,
+        reps=reps,
+        weight=weight
+    )
+    db.session.add(workout)
+    db.session.flush()
+    stats.rollup_added(workout)
+    bump_data_version(user_id)
+    log_change(user_id, 'workout_added', workout.id)
+    db.session.commit()
+    get_cache().invalidate_user(user_id)
+    return workout
+
+
+def update_workout(workout, date, exercise, sets, reps, weight):
+    old_date, old_exercise, old_volume = workout.date, workout.exercise_id, stats.workout_volume(workout)
+
+    workout.date = date
+    workout.exercise = exercise
+    workout.sets = sets
+    workout.reps = reps
+    workout.weight = weight
+    db.session.flush()
+
+    stats.rollup_month(workout.user_id, old_date, -1, -old_volume)
+    stats.rollup_month(workout.user_id, workout.date, 1, stats.workout_volume(workout))
+    stats.refresh_exercise_stats(workout.user_id, old_exercise)
+    if workout.exercise_id != old_exercise:
+        stats.refresh_exercise_stats(workout.user_id, workout.exercise_id)
+    stats.refresh_exercise_week(workout.user_id, old_exercise, old_date)
+    stats.refresh_exercise_week(workout.user_id, workout.exercise_id, workout.date)
+    bump_data_version(workout.user_id)
+    log_change(workout.user_id, 'workout_updated', workout.id)
+    db.session.commit()
+    get_cache().invalidate_user(workout.user_id)
+    return workout
+
+
+def remove_workout(workout):
+    db.session.delete(workout)
+    db.session.flush()
+    stats.rollup_month(workout.user_id, workout.date, -1, -stats.workout_volume(workout))
+    stats.refresh_exercise_stats(workout.user_id, workout.exercise_id)
+    stats.refresh_exercise_week(workout.user_id, workout.exercise_id, workout.date)
+    bump_data_version(workout.user_id)
+    log_change(workout.user_id, 'workout_deleted', workout.id)
+    db.session.commit()
+    get_cache().invalidate_user(workout.user_id)
+
+
+def add_comment(workout_id, coach_id, content):
+    comment = Comment(
+        workout_id=workout_id,
+        coach_id=coach_id,
+        content=content,
+        date=date.today()
+    )
+    workout = db.session.get(Workout, workout_id)
+    db.session.add(comment)
+    if workout:
+        db.session.flush()
+        bump_data_version(workout.user_id)
+        log_change(workout.user_id, 'comment_added', workout_id, comment.id)
+    db.session.commit()
+    if workout:
+        get_cache().invalidate_user(workout.user_id)
+    return comment
+
+
+def add_comments(coach_id, comments):
+    """Комментарии тренера к нескольким тренировкам одной транзакцией.
+
+    comments — [(workout_id, текст)]. Если хоть одна тренировка не принадлежит
+    спортсменам тренера, ничего не сохраняется и возвращается None. Иначе —
+    только затронутые тренировки с комментариями: [(тренировка, имя спортсмена)].
+    """
+    workout_ids = {workout_id for workout_id, _ in comments}
+    owners = dict(db.session.execute(
+        select(Workout.id, Workout.user_id)
+        .join(CoachAthlete, CoachAthlete.athlete_id == Workout.user_id)
+        .where(Workout.id.in_(workout_ids), CoachAthlete.coach_id == coach_id)
+    ).all())
+    if len(owners) != len(workout_ids):
+        return None
+
+    # один многострочный INSERT ... RETURNING на все комментарии, id нужны журналу
+    today = date.today()
+    created = db.session.execute(
+        insert(Comment).returning(Comment.id, Comment.workout_id),
+        [{"workout_id": workout_id, "coach_id": coach_id, "content": content, "date": today}
+         for workout_id, content in comments]
+    ).all()
+    for user_id in set(owners.values()):
+        bump_data_version(user_id)
+    db.session.execute(insert(ChangeLog), [
+        {"user_id": owners[workout_id], "kind": 'comment_added', "workout_id": workout_id,
+         "comment_id": comment_id}
+        for comment_id, workout_id in created
+    ])
+    db.session.commit()
+    for user_id in set(owners.values()):
+        get_cache().invalidate_user(user_id)
+
+    return (db.session.query(Workout, User.username)
+            .join(User, User.id == Workout.user_id)
+            .filter(Workout.id.in_(workout_ids))
+            .options(selectinload(Workout.comments))
+            .order_by(User.username, Workout.date.desc(), Workout.id.desc())
+            .all())
+
+
+# ---------- Постраничный вывод (keyset по (date, id)) ----------
+# Тренировки без даты идут после всех датированных (в SQLite NULL при
+# сортировке по убыванию последний), между собой — по убыванию id.
+def make_cursor(workout):
+    return f"{workout.date or ''}:{workout.id}"
+
+
+def parse_cursor(cursor):
+    """Курсор вида 'YYYY-MM-DD:id' (':id' — тренировка без даты); неверный курсор = первая страница."""
+    if not cursor:
+        return None
+    day, _, workout_id = cursor.rpartition(':')
+    if not workout_id.isdigit():
+        return None
+    try:
+        return (date.fromisoformat(day) if day else None), int(workout_id)
+    except ValueError:
+        return None
+
+
+def workouts_page(user_id, cursor=None, per_page=None):
+    """Страница тренировок пользователя от новых к старым и курсор следующей."""
+    query = Workout.query.filter(Workout.user_id == user_id)
+    return paginate(query, cursor, per_page)
+
+
+def paginate(query, cursor=None, per_page=None):
+    """Страница запроса тренировок от новых к старым (по курсору) и курсор следующей."""
+    per_page = per_page or current_app.config['WORKOUTS_PER_PAGE']
+    query = (query
+             .options(selectinload(Workout.comments))
+             .order_by(Workout.date.desc(), Workout.id.desc()))
+    position = parse_cursor(cursor)
+    if position and position[0] is None:
+        query = query.filter(Workout.date.is_(None), Workout.id < position[1])
+    elif position:
+        # сравнение с NULL ложно, поэтому тренировки без даты добавляются явно
+        query = query.filter(or_(tuple_(Workout.date, Workout.id) < position, Workout.date.is_(None)))
+
+    # берём на одну запись больше, чтобы узнать, есть ли следующая страница
+    workouts = query.limit(per_page + 1).all()
+    next_cursor = make_cursor(workouts[per_page - 1]) if len(workouts) > per_page else None
+    return workouts[:per_page], next_cursor
+
+
+def search_query(user_id, text):
+    """Выражение MATCH для workout_search: все слова из text как префиксы, только записи владельца."""
+    words = re.findall(r"\w+", text.replace('ё', 'е').replace('Ё', 'Е'))
+    if not words:
+        return None
+    terms = " ".join(f'"{word}"*' for word in words)
+    return f'owner:"u{user_id}" AND {{exercise comments}}: ({terms})'
+
+
+SEARCH_FILTERS = {
+    "exercise": str,
+    "date_from": date.fromisoformat,
+    "date_to": date.fromisoformat,
+    "weight_min": float,
+    "weight_max": float,
+}
+
+
+def parse_search_filters(args):
+    """Фильтры поиска из параметров запроса (q и SEARCH_FILTERS); ValueError при неверном значении."""
+    filters = {"text": args.get("q", "").strip() or None}
+    for name, convert in SEARCH_FILTERS.items():
+        value = args.get(name, "").strip()
+        try:
+            filters[name] = convert(value) if value else None
+        except ValueError:
+            raise ValueError(f"неверное значение {name}: {value}")
+    return filters
+
+
+def search_workouts(user_id, text=None, exercise=None, date_from=None, date_to=None,
+                    weight_min=None, weight_max=None, cursor=None, per_page=None):
+    """Поиск по тренировкам пользователя: текст по упражнению и комментариям (FTS5)
+    и фильтры по дате, весу и упражнению. Возвращает страницу и курсор, как workouts_page.
+    """
+    query = Workout.query.filter(Workout.user_id == user_id)
+    match = search_query(user_id, text) if text else None
+    if match:
+        # совпадения считаются в FTS один раз, дальше — обход индекса (user_id, date) с LIMIT
+        search = table('workout_search', column('rowid'))
+        matched = select(search.c.rowid).where(literal_column('workout_search').op('MATCH')(match))
+        query = query.filter(Workout.id.in_(matched))
+    if exercise:
+        exercise_id = get_catalog().exercise_id(exercise, create=False)
+        if exercise_id is None:
+            return [], None
+        query = query.filter(Workout.exercise_id == exercise_id)
+    if date_from:
+        query = query.filter(Workout.date >= date_from)
+    if date_to:
+        query = query.filter(Workout.date <= date_to)
+    if weight_min is not None:
+        query = query.filter(Workout.weight >= weight_min)
+    if weight_max is not None:
+        query = query.filter(Workout.weight <= weight_max)
+    return paginate(query, cursor, per_page)
+
+
+def parse_stats_range(args, max_buckets):
+    """Диапазон статистики из параметров запроса: from, to, period, exercise, year.
+
+    По умолчанию — текущий (или указанный в year) год по месяцам. ValueError
+    при неверном значении или если периодов больше max_buckets.
+    """
+    try:
+        year = int(args.get("year") or date.today().year)
+        date_from = date.fromisoformat(args["from"]) if args.get("from") else date(year, 1, 1)
+        date_to = date.fromisoformat(args["to"]) if args.get("to") else date(year, 12, 31)
+    except ValueError:
+        raise ValueError("неверная дата или год")
+    period = args.get("period") or "month"
+    if period not in stats.PERIODS:
+        raise ValueError(f"неверное значение period: {period}")
+    if date_from > date_to:
+        raise ValueError("начало диапазона позже конца")
+    # у крайних годов date нет соседних периодов и дней (OverflowError)
+    if not date.min.year < date_from.year <= date_to.year < date.max.year:
+        raise ValueError(f"годы — от {date.min.year + 1} до {date.max.year - 1}")
+    if len(stats.period_starts(date_from, date_to, period, max_buckets + 1)) > max_buckets:
+        raise ValueError(f"слишком длинный диапазон: больше {max_buckets} периодов")
+    return {"date_from": date_from, "date_to": date_to, "period": period,
+            "exercise": args.get("exercise", "").strip() or None}
+
+
+def range_statistics(user_id, date_from, date_to, period="month", exercise=None):
+    """stats.range_volume с упражнением по названию; неизвестное упражнение — нули."""
+    exercise_id = None
+    if exercise:
+        exercise_id = get_catalog().exercise_id(exercise, create=False)
+        if exercise_id is None:
+            return [{"start": start, "workouts": 0, "volume": 0}
+                    for start in stats.period_starts(date_from, date_to, period)]
+    return stats.range_volume(user_id, date_from, date_to, period, exercise_id)
+
+
+def daily_statistics(user_id, date_from, date_to, exercise=None):
+    """stats.daily_volume с упражнением по названию; неизвестное упражнение — пусто."""
+    exercise_id = None
+    if exercise:
+        exercise_id = get_catalog().exercise_id(exercise, create=False)
+        if exercise_id is None:
+            return {}
+    return stats.daily_volume(user_id, date_from, date_to, exercise_id)
+
+
+def latest_workouts(user_ids, per_page):
+    """Первые страницы тренировок сразу для нескольких пользователей одним запросом."""
+    rank = func.row_number().over(
+        partition_by=Workout.user_id,
+        order_by=(Workout.date.desc(), Workout.id.desc())
+    ).label('rank')
+    ranked = (select(Workout.id, rank)
+              .where(Workout.user_id.in_(user_ids))
+              .subquery())
+    workouts = (Workout.query
+                .join(ranked, ranked.c.id == Workout.id)
+                .filter(ranked.c.rank <= per_page + 1)
+                .options(selectinload(Workout.comments))
+                .order_by(Workout.date.desc(), Workout.id.desc())
+                .all())
+
+    pages = {user_id: [] for user_id in user_ids}
+    for w in workouts:
+        pages[w.user_id].append(w)
+    result = {}
+    for user_id, items in pages.items():
+        next_cursor = make_cursor(items[per_page - 1]) if len(items) > per_page else None
+        result[user_id] = (items[:per_page], next_cursor)
+    return result
+
+
+# ---------- Каталог упражнений ----------
+def merge_exercises(name, aliases):
+    """Делает aliases написаниями упражнения name.
+
+    Упражнения, которые уже были под этими написаниями, сливаются в name:
+    их тренировки переходят на него, сводки затронутых пользователей
+    пересобираются. Возвращает число перенесённых тренировок.
+    """
+    catalog = get_catalog()
+    target = catalog.exercise_id(name)
+    merged = set()
+    for alias in aliases:
+        key = exercise_key(alias)
+        source = catalog.exercise_id(alias, create=False)
+        if source is None and key:
+            db.session.execute(insert(ExerciseAlias).values(key=key, exercise_id=target))
+        elif source is not None and source != target:
+            merged.add(source)
+
+    user_ids, moved = [], 0
+    if merged:
+        user_ids = db.session.execute(
+            select(Workout.user_id).where(Workout.exercise_id.in_(merged)).distinct()
+        ).scalars().all()
+        db.session.execute(update(ExerciseAlias).where(ExerciseAlias.exercise_id.in_(merged))
+                           .values(exercise_id=target))
+        moved = db.session.execute(update(Workout).where(Workout.exercise_id.in_(merged))
+                                   .values(exercise_id=target)).rowcount
+        db.session.execute(delete(Exercise).where(Exercise.id.in_(merged)))
+        bump_catalog_version()  # другие процессы сбросят каталог, не дожидаясь TTL
+        for user_id in user_ids:
+            stats.rebuild_rollups(user_id)
+            bump_data_version(user_id)
+    reindex_exercise_search(db.session.connection(), target)
+    db.session.commit()
+    catalog.clear()
+    for user_id in user_ids:
+        get_cache().invalidate_user(user_id)
+    return moved
+
+
+# ---------- Спортсмены тренера ----------
+def assign_athlete(coach_id, athlete_id):
+    db.session.execute(sqlite_insert(CoachAthlete)
+                       .values(coach_id=coach_id, athlete_id=athlete_id)
+                       .on_conflict_do_nothing())
+    db.session.commit()
+
+
+def unassign_athlete(coach_id, athlete_id):
+    db.session.execute(delete(CoachAthlete).where(CoachAthlete.coach_id == coach_id,
+                                                  CoachAthlete.athlete_id == athlete_id))
+    db.session.commit()
+
+
+def coach_athletes(coach_id, athlete_id=None):
+    """Спортсмены тренера по имени; выборка по индексу (coach_id, athlete_id)."""
+    query = (User.query
+             .join(CoachAthlete, CoachAthlete.athlete_id == User.id)
+             .filter(CoachAthlete.coach_id == coach_id, User.role == 'user'))
+    if athlete_id:
+        query = query.filter(User.id == athlete_id)
+    return query.order_by(User.username).all()
+
+
+def coach_workout(coach_id, workout_id):
+    """Тренировка, если она принадлежит спортсмену тренера, иначе None."""
+    return (Workout.query
+            .join(CoachAthlete, CoachAthlete.athlete_id == Workout.user_id)
+            .filter(Workout.id == workout_id, CoachAthlete.coach_id == coach_id)
+            .first())
+
+
+# ---------- Лента изменений для тренера ----------
+def latest_change_id():
+    return db.session.execute(select(func.max(ChangeLog.id))).scalar() or 0
+
+
+def changes_since(cursor, limit, coach_id):
+    """Изменения у спортсменов тренера после курсора: [(запись, имя, тренировка, комментарий)].
+
+    Тренировки и комментарии подгружаются двумя запросами по id, удалённые — None.
+    """
+    rows = db.session.execute(
+        select(ChangeLog, User.username)
+        .join(CoachAthlete, (CoachAthlete.athlete_id == ChangeLog.user_id)
+              & (CoachAthlete.coach_id == coach_id))
+        .join(User, User.id == ChangeLog.user_id)
+        .where(ChangeLog.id > cursor, User.role == 'user')
+        .order_by(ChangeLog.id)
+        .limit(limit)
+    ).all()
+    workout_ids = {change.workout_id for change, _ in rows if change.workout_id}
+    comment_ids = {change.comment_id for change, _ in rows if change.comment_id}
+    workouts = {w.id: w for w in Workout.query.filter(Workout.id.in_(workout_ids))} if workout_ids else {}
+    comments = {c.id: c for c in Comment.query.filter(Comment.id.in_(comment_ids))} if comment_ids else {}
+    return [(change, username, workouts.get(change.workout_id), comments.get(change.comment_id))
+            for change, username in rows]
+
+
+# ---------- Удаление пользователя ----------
+def purge_user(user_id, batch_size=None):
+    """Удаляет пользователя со всеми тренировками, комментариями и сводками.
+
+    Всё удаляется наборными DELETE по индексам. С batch_size тренировки и
+    комментарии удаляются пачками, каждая в своей транзакции, чтобы не
+    блокировать базу надолго.
+    """
+    # у спортсменов, которых комментировал этот тренер, поменяются страницы
+    athletes = db.session.execute(
+        select(Workout.user_id).distinct()
+        .join(Comment, Comment.workout_id == Workout.id)
+        .where(Comment.coach_id == user_id)
+    ).scalars().all()
+
+    def delete_in_batches(model, condition):
+        while True:
+            ids = select(model.id).where(condition)
+            if batch_size:
+                ids = ids.limit(batch_size)
+            ids = db.session.execute(ids).scalars().all()
+            if not ids:
+                return
+            if model is Workout:
+                db.session.execute(delete(Comment).where(Comment.workout_id.in_(ids)))
+            db.session.execute(delete(model).where(model.id.in_(ids)))
+            db.session.commit()
+
+    delete_in_batches(Comment, Comment.coach_id == user_id)
+    delete_in_batches(Workout, Workout.user_id == user_id)
+
+    db.session.execute(delete(MonthlyVolume).where(MonthlyVolume.user_id == user_id))
+    db.session.execute(delete(ExerciseStats).where(ExerciseStats.user_id == user_id))
+    db.session.execute(delete(ExerciseWeek).where(ExerciseWeek.user_id == user_id))
+    db.session.execute(delete(ChangeLog).where(ChangeLog.user_id == user_id))
+    db.session.execute(delete(CoachAthlete).where((CoachAthlete.coach_id == user_id)
+                                                  | (CoachAthlete.athlete_id == user_id)))
+    db.session.execute(delete(User).where(User.id == user_id))
+    for athlete_id in [user_id, *athletes]:
+        bump_data_version(athlete_id)
+    db.session.commit()
+
+    cache = get_cache()
+    for athlete_id in [user_id, *athletes]:
+        cache.invalidate_user(athlete_id)
+    invalidate_principal(user_id)
+
+
+# id пользователей, которых сейчас удаляют фоновые потоки этого процесса
+running_purges = set()
+running_purges_lock = threading.Lock()
+
+
+def purge_running(user_id):
+    with running_purges_lock:
+        return user_id in running_purges
+
+
+def start_background_purge(user_id):
+    """Запускает удаление в фоновом потоке; если оно уже идёт — ничего не делает и возвращает None."""
+    app = current_app._get_current_object()
+    with running_purges_lock:
+        if user_id in running_purges:
+            return None
+        running_purges.add(user_id)
+
+    def run():
+        try:
+            with app.app_context():
+                try:
+                    purge_user(user_id, batch_size=app.config['PURGE_BATCH_SIZE'])
+                except Exception:
+                    # пользователь остаётся в роли 'deleting', админ может повторить удаление
+                    app.logger.exception("Фоновое удаление пользователя %s прервано", user_id)
+                    db.session.rollback()
+        finally:
+            with running_purges_lock:
+                running_purges.discard(user_id)
+
+    thread = threading.Thread(target=run, name=f"purge-user-{user_id}", daemon=True)
+    thread.start()
+    return thread
+
+
+# ---------- Импорт и выгрузка ----------
+def import_workouts(user_id, stream, fmt, batch_size=None):
+    """Импортирует тренировки из текстового потока пачками (executemany на пачку).
+
+    Ошибочные строки пропускаются и попадают в отчёт, остальные сохраняются.
+    """
+    import importer
+
+    batch_size = batch_size or current_app.config['IMPORT_BATCH_SIZE']
+    catalog = get_catalog()
+    result = importer.ImportResult()
+    batch = []
+
+    def flush_batch():
+        if batch:
+            db.session.execute(insert(Workout), batch)
+            db.session.commit()
+            result.imported += len(batch)
+            batch.clear()
+
+    line_no = 0
+    try:
+        try:
+            for line_no, row in importer.read_rows(stream, fmt):
+                try:
+                    values = importer.parse_row(row)
+                except ValueError as e:
+                    result.add_error(line_no, str(e))
+                    continue
+                values["user_id"] = user_id
+                values["exercise_id"] = catalog.exercise_id(values.pop("exercise"))
+                batch.append(values)
+                if len(batch) >= batch_size:
+                    flush_batch()
+        except (UnicodeDecodeError, csv.Error) as e:
+            # дальше файл не прочитать; разобранные строки всё равно сохраняем
+            result.add_error(line_no + 1, f"файл не читается дальше: {e}")
+        flush_batch()
+    finally:
+        # при любой ошибке уже закоммиченные пачки должны попасть в сводки и кэш
+        if result.imported:
+            db.session.rollback()  # недописанная пачка, если упали на ней
+            # сводки пересобираются одним проходом, а не построчно
+            stats.rebuild_rollups(user_id)
+            bump_data_version(user_id)
+            log_change(user_id, 'workouts_imported')
+            db.session.commit()
+            get_cache().invalidate_user(user_id)
+    return result
+
+
+def export_records(user_id):
+    """Тренировки пользователя с комментариями — один запрос, строки читаются порциями."""
+    catalog = get_catalog()
+    query = (select(Workout.id, Workout.date, Workout.exercise_id, Workout.sets, Workout.reps, Workout.weight,
+                    Comment.id.label('comment_id'), Comment.content, Comment.date.label('comment_date'))
+             .outerjoin(Comment, Comment.workout_id == Workout.id)
+             .where(Workout.user_id == user_id)
+             .order_by(Workout.date, Workout.id, Comment.id)
+             .execution_options(yield_per=500))
+
+    workout, comments = None, []
+    for row in db.session.execute(query):
+        if workout is None or row.id != workout["id"]:
+            if workout is not None:
+                yield workout, comments
+            workout = {"id": row.id, "date": row.date.isoformat() if row.date else None,
+                       "exercise": catalog.name(row.exercise_id), "sets": row.sets, "reps": row.reps, "weight": row.weight}
+            comments = []
+        if row.comment_id is not None:
+            comments.append({"content": row.content,
+                             "date": row.comment_date.isoformat() if row.comment_date else None})
+    if workout is not None:
+        yield workout, comments
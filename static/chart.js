@@ -0,0 +1,147 @@
+/* Небольшие графики на canvas без внешних библиотек.
+ *
+ * Элемент <div data-charts="/api/v1/charts/..."> получает JSON
+ *   {"charts": [{"title", "labels": [...], "series": [{"name", "type": "bar"|"line", "values": [...]}],
+ *                "marks": [индексы точек с отметкой ★]}]}
+ * (или один такой объект без "charts") и рисует по графику на каждый элемент.
+ * Данные уже подготовлены сервером, здесь только отрисовка.
+ */
+(function () {
+  "use strict";
+
+  var COLORS = ["#4bc0c0", "#ff9f40", "#9966ff", "#ff6384", "#36a2eb"];
+  var HEIGHT = 260;
+  var PAD = {left: 56, right: 12, top: 34, bottom: 28};
+
+  function niceStep(max, ticks) {
+    var raw = max / ticks;
+    var power = Math.pow(10, Math.floor(Math.log(raw) / Math.LN10));
+    var steps = [1, 2, 2.5, 5, 10];
+    for (var i = 0; i < steps.length; i++) {
+      if (steps[i] * power >= raw) return steps[i] * power;
+    }
+    return 10 * power;
+  }
+
+  function formatNumber(value) {
+    if (Math.abs(value) >= 1e6) return (value / 1e6).toFixed(1).replace(/\.0$/, "") + "M";
+    if (Math.abs(value) >= 1e3) return (value / 1e3).toFixed(1).replace(/\.0$/, "") + "k";
+    return String(Math.round(value * 10) / 10);
+  }
+
+  function draw(canvas, chart) {
+    var ratio = window.devicePixelRatio || 1;
+    var width = canvas.parentNode.clientWidth || 600;
+    canvas.width = width * ratio;
+    canvas.height = HEIGHT * ratio;
+    canvas.style.width = width + "px";
+    canvas.style.height = HEIGHT + "px";
+    var ctx = canvas.getContext("2d");
+    ctx.scale(ratio, ratio);
+    ctx.font = "12px sans-serif";
+
+    var labels = chart.labels || [];
+    var series = chart.series || [];
+    var max = 0;
+    series.forEach(function (s) {
+      s.values.forEach(function (v) { if (v !== null && v > max) max = v; });
+    });
+    var step = niceStep(max || 1, 5);
+    var top = Math.ceil((max || 1) / step) * step;
+    var plotW = width - PAD.left - PAD.right;
+    var plotH = HEIGHT - PAD.top - PAD.bottom;
+    var slot = plotW / Math.max(labels.length, 1);
+    var y = function (v) { return PAD.top + plotH - v / top * plotH; };
+    var x = function (i) { return PAD.left + slot * (i + 0.5); };
+
+    // заголовок и легенда
+    ctx.fillStyle = "#333";
+    ctx.textAlign = "left";
+    ctx.fillText(chart.title || "", PAD.left, 14);
+    var legendX = width - PAD.right;
+    ctx.textAlign = "right";
+    series.slice().reverse().forEach(function (s, i) {
+      var color = COLORS[(series.length - 1 - i) % COLORS.length];
+      ctx.fillStyle = "#333";
+      ctx.fillText(s.name, legendX, 14);
+      legendX -= ctx.measureText(s.name).width + 16;
+      ctx.fillStyle = color;
+      ctx.fillRect(legendX + 4, 5, 10, 10);
+      legendX -= 8;
+    });
+
+    // сетка и подписи осей
+    ctx.strokeStyle = "#e5e5e5";
+    ctx.fillStyle = "#666";
+    ctx.textAlign = "right";
+    for (var v = 0; v <= top + step / 2; v += step) {
+      ctx.beginPath();
+      ctx.moveTo(PAD.left, y(v));
+      ctx.lineTo(width - PAD.right, y(v));
+      ctx.stroke();
+      ctx.fillText(formatNumber(v), PAD.left - 6, y(v) + 4);
+    }
+    ctx.textAlign = "center";
+    var every = Math.ceil(labels.length / Math.max(Math.floor(plotW / 70), 1));
+    labels.forEach(function (label, i) {
+      if (i % every === 0) ctx.fillText(label, x(i), HEIGHT - 8);
+    });
+
+    var bars = series.filter(function (s) { return s.type !== "line"; });
+    var barW = slot * 0.8 / Math.max(bars.length, 1);
+    series.forEach(function (s, n) {
+      ctx.fillStyle = ctx.strokeStyle = COLORS[n % COLORS.length];
+      if (s.type === "line") {
+        ctx.lineWidth = 2;
+        ctx.beginPath();
+        var started = false;
+        s.values.forEach(function (value, i) {
+          if (value === null) { started = false; return; }
+          if (started) ctx.lineTo(x(i), y(value)); else ctx.moveTo(x(i), y(value));
+          started = true;
+        });
+        ctx.stroke();
+        ctx.lineWidth = 1;
+      } else {
+        var offset = bars.indexOf(s) * barW - slot * 0.4;
+        s.values.forEach(function (value, i) {
+          if (value) ctx.fillRect(x(i) + offset, y(value), barW, PAD.top + plotH - y(value));
+        });
+      }
+    });
+
+    // отметки (рекорды) над первой серией
+    if (chart.marks && series.length) {
+      ctx.fillStyle = "#d4a000";
+      ctx.textAlign = "center";
+      chart.marks.forEach(function (i) {
+        var value = series[0].values[i];
+        if (value !== null && value !== undefined) ctx.fillText("★", x(i), y(value) - 6);
+      });
+    }
+  }
+
+  function render(container, data) {
+    (data.charts || [data]).forEach(function (chart) {
+      var canvas = document.createElement("canvas");
+      canvas.setAttribute("role", "img");
+      canvas.setAttribute("aria-label", chart.title || "");
+      container.appendChild(canvas);
+      draw(canvas, chart);
+    });
+  }
+
+  function init() {
+    var containers = document.querySelectorAll("[data-charts]");
+    Array.prototype.forEach.call(containers, function (container) {
+      fetch(container.getAttribute("data-charts"), {credentials: "same-origin"})
+        .then(function (response) { return response.json(); })
+        .then(function (data) { render(container, data); })
+        .catch(function () { container.textContent = "Не удалось загрузить график"; });
+    });
+  }
+
+  window.TrainingCharts = {draw: draw, render: render};
+  if (document.readyState === "loading") document.addEventListener("DOMContentLoaded", init);
+  else init();
+})();
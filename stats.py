@@ -0,0 +1,430 @@
+"""Агрегаты по тренировкам, которые считаются на стороне SQL.
+
+Страницы и API читают сводные таблицы MonthlyVolume, ExerciseStats и
+ExerciseWeek, которые ведут функции ниже. user_totals и monthly_volume
+считают то же прямо по таблице workout; в чтении они не участвуют и служат
+эталоном для проверки сводок (rollup_totals, rollup_monthly) в тестах.
+"""
+from datetime import date, timedelta
+from itertools import islice
+
+from sqlalchemy import func, tuple_, case, cast, delete, select, insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Workout, MonthlyVolume, ExerciseStats, ExerciseWeek
+
+
+def volume(model=Workout):
+    """Выражение объёма тренировки: вес * повторения * подходы."""
+    return model.weight * model.reps * model.sets
+
+
+def workout_volume(workout):
+    """Объём уже загруженной тренировки."""
+    return (workout.weight or 0) * (workout.reps or 0) * (workout.sets or 0)
+
+
+def estimated_1rm(weight, reps):
+    """Оценка максимума на одно повторение по формуле Эпли."""
+    if weight is None or reps is None:
+        return None
+    return weight if reps <= 1 else weight * (1 + reps / 30)
+
+
+def e1rm(model=Workout):
+    """То же выражением SQL."""
+    return case((model.reps <= 1, model.weight), else_=model.weight * (1 + model.reps / 30.0))
+
+
+def week_of(day):
+    """Понедельник недели, в которую попадает день."""
+    return day - timedelta(days=day.weekday())
+
+
+def greatest(current, new):
+    # max() в SQLite с NULL среди аргументов даёт NULL
+    return func.max(func.coalesce(current, new), func.coalesce(new, current))
+
+
+def user_totals(user_id):
+    """Количество тренировок пользователя и их общий объём (эталон для rollup_totals)."""
+    count, total = (Workout.query
+                    .with_entities(func.count(Workout.id),
+                                   func.coalesce(func.sum(volume()), 0))
+                    .filter(Workout.user_id == user_id)
+                    .one())
+    return count, total
+
+
+def monthly_volume(user_id, year):
+    """Объём по месяцам года: {1: ..., ..., 12: ...} (эталон для rollup_monthly)."""
+    month = func.strftime('%m', Workout.date)
+    rows = (Workout.query
+            .with_entities(month, func.sum(volume()))
+            .filter(Workout.user_id == user_id,
+                    Workout.date >= date(year, 1, 1),
+                    Workout.date < date(year + 1, 1, 1))
+            .group_by(month)
+            .all())
+
+    monthly_stats = {i: 0 for i in range(1, 13)}
+    for m, total in rows:
+        monthly_stats[int(m)] = total
+    return monthly_stats
+
+
+# ---------- Сводные таблицы ----------
+def rollup_month(user_id, day, workouts, volume):
+    """Прибавляет (или вычитает) тренировки и объём в месячной сводке."""
+    if day is None:
+        return
+    stmt = sqlite_insert(MonthlyVolume).values(
+        user_id=user_id, year=day.year, month=day.month, workouts=workouts, volume=volume
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'year', 'month'],
+        set_={'workouts': MonthlyVolume.workouts + stmt.excluded.workouts,
+              'volume': MonthlyVolume.volume + stmt.excluded.volume}
+    )
+    db.session.execute(stmt)
+    if workouts < 0:
+        db.session.execute(delete(MonthlyVolume).where(
+            MonthlyVolume.user_id == user_id, MonthlyVolume.year == day.year,
+            MonthlyVolume.month == day.month, MonthlyVolume.workouts <= 0
+        ))
+
+
+def rollup_added(workout):
+    """Учитывает новую тренировку в сводках без пересчёта истории."""
+    rollup_month(workout.user_id, workout.date, 1, workout_volume(workout))
+    if workout.exercise_id is None:
+        return
+
+    stmt = sqlite_insert(ExerciseStats).values(
+        user_id=workout.user_id, exercise_id=workout.exercise_id, workouts=1,
+        volume=workout_volume(workout), best_weight=workout.weight,
+        last_weight=workout.weight, last_date=workout.date, last_workout_id=workout.id
+    )
+    new = stmt.excluded
+    is_latest = (ExerciseStats.last_date.is_(None)
+                 | (tuple_(ExerciseStats.last_date, ExerciseStats.last_workout_id)
+                    <= tuple_(new.last_date, new.last_workout_id)))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'exercise_id'],
+        set_={'workouts': ExerciseStats.workouts + 1,
+              'volume': ExerciseStats.volume + new.volume,
+              'best_weight': greatest(ExerciseStats.best_weight, new.best_weight),
+              'last_weight': case((is_latest, new.last_weight), else_=ExerciseStats.last_weight),
+              'last_date': case((is_latest, new.last_date), else_=ExerciseStats.last_date),
+              'last_workout_id': case((is_latest, new.last_workout_id), else_=ExerciseStats.last_workout_id)}
+    )
+    db.session.execute(stmt)
+    if workout.date is None:
+        return
+
+    stmt = sqlite_insert(ExerciseWeek).values(
+        user_id=workout.user_id, exercise_id=workout.exercise_id, week=week_of(workout.date), workouts=1,
+        best_weight=workout.weight, best_e1rm=estimated_1rm(workout.weight, workout.reps)
+    )
+    new = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['user_id', 'exercise_id', 'week'],
+        set_={'workouts': ExerciseWeek.workouts + 1,
+              'best_weight': greatest(ExerciseWeek.best_weight, new.best_weight),
+              'best_e1rm': greatest(ExerciseWeek.best_e1rm, new.best_e1rm)}
+    )
+    db.session.execute(stmt)
+
+
+def refresh_exercise_stats(user_id, exercise_id):
+    """Пересчитывает одну строку ExerciseStats по индексу (user_id, exercise_id, date).
+
+    Нужен после изменения или удаления: лучший и последний вес нельзя
+    получить вычитанием.
+    """
+    if exercise_id is None:
+        return
+    db.session.execute(delete(ExerciseStats).where(
+        ExerciseStats.user_id == user_id, ExerciseStats.exercise_id == exercise_id
+    ))
+    base = Workout.query.filter(Workout.user_id == user_id, Workout.exercise_id == exercise_id)
+    count, total, best = base.with_entities(
+        func.count(Workout.id), func.coalesce(func.sum(volume()), 0), func.max(Workout.weight)
+    ).one()
+    if not count:
+        return
+    last = base.order_by(Workout.date.desc(), Workout.id.desc()).first()
+    db.session.execute(insert(ExerciseStats).values(
+        user_id=user_id, exercise_id=exercise_id, workouts=count, volume=total,
+        best_weight=best, last_weight=last.weight, last_date=last.date, last_workout_id=last.id
+    ))
+
+
+def refresh_exercise_week(user_id, exercise_id, day):
+    """Пересчитывает неделю упражнения, в которую попадает day (после изменения или удаления)."""
+    if exercise_id is None or day is None:
+        return
+    week = week_of(day)
+    db.session.execute(delete(ExerciseWeek).where(
+        ExerciseWeek.user_id == user_id, ExerciseWeek.exercise_id == exercise_id, ExerciseWeek.week == week
+    ))
+    count, best_weight, best_e1rm = db.session.execute(
+        select(func.count(Workout.id), func.max(Workout.weight), func.max(e1rm()))
+        .where(Workout.user_id == user_id, Workout.exercise_id == exercise_id,
+               Workout.date >= week, Workout.date < week + timedelta(days=7))
+    ).one()
+    if count:
+        db.session.execute(insert(ExerciseWeek).values(
+            user_id=user_id, exercise_id=exercise_id, week=week, workouts=count,
+            best_weight=best_weight, best_e1rm=best_e1rm
+        ))
+
+
+def rebuild_rollups(user_id=None):
+    """Полностью пересобирает сводки из тренировок (для всех или одного пользователя)."""
+    workouts_filter = [] if user_id is None else [Workout.user_id == user_id]
+    for model in (MonthlyVolume, ExerciseStats, ExerciseWeek):
+        query = delete(model)
+        if user_id is not None:
+            query = query.where(model.user_id == user_id)
+        db.session.execute(query)
+
+    year = cast(func.strftime('%Y', Workout.date), db.Integer)
+    month = cast(func.strftime('%m', Workout.date), db.Integer)
+    db.session.execute(insert(MonthlyVolume).from_select(
+        ['user_id', 'year', 'month', 'workouts', 'volume'],
+        select(Workout.user_id, year, month, func.count(Workout.id),
+               func.coalesce(func.sum(volume()), 0))
+        .where(Workout.date.isnot(None), *workouts_filter)
+        .group_by(Workout.user_id, year, month)
+    ))
+
+    group = (Workout.user_id, Workout.exercise_id)
+    ranked = (select(
+        Workout.user_id, Workout.exercise_id, Workout.id, Workout.weight, Workout.date,
+        func.row_number().over(partition_by=group,
+                               order_by=(Workout.date.desc(), Workout.id.desc())).label('rank'),
+        func.count(Workout.id).over(partition_by=group).label('workouts'),
+        func.coalesce(func.sum(volume()).over(partition_by=group), 0).label('volume'),
+        func.max(Workout.weight).over(partition_by=group).label('best_weight'),
+    ).where(Workout.exercise_id.isnot(None), *workouts_filter).subquery())
+    db.session.execute(insert(ExerciseStats).from_select(
+        ['user_id', 'exercise_id', 'workouts', 'volume', 'best_weight',
+         'last_weight', 'last_date', 'last_workout_id'],
+        select(ranked.c.user_id, ranked.c.exercise_id, ranked.c.workouts, ranked.c.volume,
+               ranked.c.best_weight, ranked.c.weight, ranked.c.date, ranked.c.id)
+        .where(ranked.c.rank == 1)
+    ))
+
+    week = func.date(Workout.date, 'weekday 0', '-6 days')  # понедельник
+    db.session.execute(insert(ExerciseWeek).from_select(
+        ['user_id', 'exercise_id', 'week', 'workouts', 'best_weight', 'best_e1rm'],
+        select(Workout.user_id, Workout.exercise_id, week, func.count(Workout.id),
+               func.max(Workout.weight), func.max(e1rm()))
+        .where(Workout.exercise_id.isnot(None), Workout.date.isnot(None), *workouts_filter)
+        .group_by(Workout.user_id, Workout.exercise_id, week)
+    ))
+
+
+def rollup_totals(user_id):
+    """Число тренировок и общий объём пользователя из сводки."""
+    return (db.session.query(func.coalesce(func.sum(ExerciseStats.workouts), 0),
+                             func.coalesce(func.sum(ExerciseStats.volume), 0))
+            .filter(ExerciseStats.user_id == user_id)
+            .one())
+
+
+def exercise_names(user_id):
+    """Упражнения пользователя по алфавиту (подсказки в формах) — из сводки, без чужих названий."""
+    names = (row.exercise for row in ExerciseStats.query.filter_by(user_id=user_id))
+    return sorted((name for name in names if name), key=str.casefold)
+
+
+def rollup_monthly(user_id, year):
+    """Объём по месяцам года из сводки: {1: ..., ..., 12: ...}."""
+    monthly_stats = {i: 0 for i in range(1, 13)}
+    rows = MonthlyVolume.query.filter_by(user_id=user_id, year=year).all()
+    for row in rows:
+        monthly_stats[row.month] = row.volume
+    return monthly_stats
+
+
+# ---------- Статистика за произвольный период ----------
+PERIODS = ("week", "month", "year")
+
+
+def period_start(day, period):
+    """Начало недели (понедельник), месяца или года, в которые попадает день."""
+    if period == "week":
+        return week_of(day)
+    if period == "month":
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def next_period(start, period):
+    if period == "week":
+        return start + timedelta(days=7)
+    if period == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start.replace(year=start.year + 1)
+
+
+def period_starts(date_from, date_to, period, limit=None):
+    """Начала всех периодов, пересекающих [date_from, date_to], не больше limit."""
+    def starts():
+        start = period_start(date_from, period)
+        while start <= date_to:
+            yield start
+            start = next_period(start, period)
+    return list(islice(starts(), limit))
+
+
+def period_expr(period):
+    """Начало периода выражением SQL (строка YYYY-MM-DD)."""
+    if period == "week":
+        return func.date(Workout.date, '-6 days', 'weekday 1')
+    return func.strftime('%Y-%m-01' if period == "month" else '%Y-01-01', Workout.date)
+
+
+def range_volume(user_id, date_from, date_to, period="month", exercise_id=None):
+    """Тренировки и объём по неделям, месяцам или годам за [date_from, date_to].
+
+    [{"start", "workouts", "volume"}, ...] — все периоды подряд, пустые с нулями.
+    Читаются только строки внутри диапазона по индексам (user_id, date) и
+    (user_id, exercise_id, date); целые месяцы без фильтра по упражнению
+    берутся из сводки MonthlyVolume, так что годы истории — это десятки строк.
+    """
+    totals = {start: [0, 0] for start in period_starts(date_from, date_to, period)}
+
+    def add(day, workouts, total):
+        bucket = totals[period_start(day, period)]
+        bucket[0] += workouts
+        bucket[1] += total or 0
+
+    ranges = [(date_from, date_to)]
+    full_from = period_start(date_from, "month")
+    if full_from < date_from:
+        full_from = next_period(full_from, "month")
+    full_to = period_start(date_to + timedelta(days=1), "month")  # первый месяц после целых
+    if exercise_id is None and period != "week" and full_from < full_to:
+        rows = MonthlyVolume.query.filter(
+            MonthlyVolume.user_id == user_id,
+            tuple_(MonthlyVolume.year, MonthlyVolume.month) >= (full_from.year, full_from.month),
+            tuple_(MonthlyVolume.year, MonthlyVolume.month) < (full_to.year, full_to.month),
+        )
+        for row in rows:
+            add(date(row.year, row.month, 1), row.workouts, row.volume)
+        # неполные месяцы по краям — по тренировкам
+        ranges = [(date_from, full_from - timedelta(days=1)), (full_to, date_to)]
+
+    start_expr = period_expr(period)
+    for start, end in ranges:
+        if start > end:
+            continue
+        query = (db.session.query(start_expr, func.count(Workout.id), func.sum(volume()))
+                 .filter(Workout.user_id == user_id, Workout.date >= start, Workout.date <= end))
+        if exercise_id is not None:
+            query = query.filter(Workout.exercise_id == exercise_id)
+        for day, workouts, total in query.group_by(start_expr):
+            add(date.fromisoformat(day), workouts, total)
+    return [{"start": start, "workouts": workouts, "volume": total}
+            for start, (workouts, total) in totals.items()]
+
+
+def daily_volume(user_id, date_from, date_to, exercise_id=None):
+    """Объём по дням за [date_from, date_to]: {день: объём}, только дни с тренировками."""
+    query = (db.session.query(Workout.date, func.coalesce(func.sum(volume()), 0))
+             .filter(Workout.user_id == user_id, Workout.date >= date_from, Workout.date <= date_to))
+    if exercise_id is not None:
+        query = query.filter(Workout.exercise_id == exercise_id)
+    return dict(query.group_by(Workout.date).all())
+
+
+def calendar_heatmap(daily, date_from, date_to):
+    """Календарь для тепловой карты: недели (столбцы) по 7 дней с понедельника.
+
+    День — {"date", "volume", "level"}, level 0–4 относительно самого
+    объёмного дня; дни вне диапазона — None.
+    """
+    top = max(daily.values(), default=0)
+    weeks = []
+    for monday in period_starts(date_from, date_to, "week"):
+        week = []
+        for offset in range(7):
+            day = monday + timedelta(days=offset)
+            if day < date_from or day > date_to:
+                week.append(None)
+                continue
+            value = daily.get(day, 0)
+            level = min(4, max(1, -(-4 * value // top))) if value > 0 else 0
+            week.append({"date": day, "volume": value, "level": int(level)})
+        weeks.append(week)
+    return weeks
+
+
+# ---------- Ряды прогресса ----------
+def progress_series(user_id, max_points):
+    """Недельные точки прогресса по упражнениям, не больше max_points на упражнение.
+
+    {упражнение: {"points": [{"week", "weight", "e1rm", "pr"}, ...], "best_e1rm": ...}}
+    pr — в неделях, которые представляет точка, побит прежний рекорд 1ПМ.
+    """
+    rows = (ExerciseWeek.query.filter_by(user_id=user_id)
+            .order_by(ExerciseWeek.exercise_id, ExerciseWeek.week))
+    weeks_by_exercise = {}
+    for row in rows:
+        weeks_by_exercise.setdefault(row.exercise, []).append(row)
+
+    result = {}
+    for exercise, weeks in sorted(weeks_by_exercise.items(), key=lambda item: (item[0] or "").casefold()):
+        points = []
+        record = None
+        for week in weeks:
+            is_pr = record is not None and week.best_e1rm is not None and week.best_e1rm > record
+            if record is None or (week.best_e1rm or 0) > record:
+                record = week.best_e1rm
+            points.append({"week": week.week, "weight": week.best_weight,
+                           "e1rm": round(week.best_e1rm, 1) if week.best_e1rm is not None else None,
+                           "pr": is_pr})
+        result[exercise] = {"points": downsample(points, max_points), "best_e1rm": record}
+    return result
+
+
+def downsample(points, max_points):
+    """Прореживает точки методом LTTB; отметки рекордов переносятся на оставшиеся точки."""
+    kept = lttb([p["week"].toordinal() for p in points], [p["weight"] or 0 for p in points], max_points)
+    if len(kept) == len(points):
+        return points
+    result = []
+    previous = -1
+    for index in kept:
+        point = dict(points[index])
+        point["pr"] = any(p["pr"] for p in points[previous + 1:index + 1])
+        result.append(point)
+        previous = index
+    return result
+
+
+def lttb(xs, ys, threshold):
+    """Largest-Triangle-Three-Buckets: индексы threshold точек, лучше всего сохраняющих форму ряда."""
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = sum(xs[end:next_end]) / (next_end - end)
+        avg_y = sum(ys[end:next_end]) / (next_end - end)
+        best, best_area = start, -1
+        for j in range(start, end):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
@@ -1,12 +1,13 @@
 import pytest
-from app import app as flask_app, db as _db
-from app import User, Workout
+from app import create_app
+from models import db as _db
+from models import User, Workout
 
 @pytest.fixture(scope='session')
 def test_app():
-    flask_app.config['TESTING'] = True
-    flask_app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
-    flask_app.config['WTF_CSRF_ENABLED'] = False
+    flask_app = create_app({'TESTING': True,
+                            'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                            'WTF_CSRF_ENABLED': False})
 
     with flask_app.app_context():
         _db.create_all()
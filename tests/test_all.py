@@ -1,6 +1,16 @@
-import pytest
-from app import app, db, User, Workout
+import re
+import time
 from datetime import datetime, date
+
+import pytest
+from sqlalchemy import event
+from app import create_app
+from models import db, User, CoachAthlete, Workout, Comment, MonthlyVolume, ExerciseStats, ExerciseWeek
+
+app = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+response_cache = app.extensions['response_cache']
+
+
 @pytest.fixture
 def client():
     app.config['TESTING'] = True
@@ -11,8 +21,13 @@ def client():
         yield client
         with app.app_context():
             db.drop_all()
+        response_cache.clear()
 
 
+def add_owner(user_id=1):
+    # внешние ключи включены: тренировке нужен существующий пользователь
+    db.session.add(User(id=user_id, username=f"owner{user_id}", password_hash="-"))
+    db.session.commit()
 
 
 # ===================== Регистрация и логин =====================
@@ -42,6 +57,49 @@ def test_login_nonexistent_user(client):
     assert "Неверный логин или пароль" in rv.data.decode()
 
 
+def test_login_rehashes_password_with_new_method(client):
+    client.post("/register", data={"username": "rehash", "password": "pass"})
+    with client.application.app_context():
+        assert User.query.filter_by(username="rehash").first().password_hash.startswith("scrypt:")
+
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    try:
+        client.post("/login", data={"username": "rehash", "password": "pass"})
+        with client.application.app_context():
+            user = User.query.filter_by(username="rehash").first()
+            assert user.password_hash.startswith("pbkdf2:sha256:1000$")
+            assert not user.password_needs_rehash()
+        client.get("/logout")
+        rv = client.post("/login", data={"username": "rehash", "password": "pass"}, follow_redirects=True)
+        assert "Неверный логин или пароль" not in rv.data.decode()
+    finally:
+        app.config['PASSWORD_HASH_METHOD'] = 'scrypt:32768:8:1'
+
+
+def test_user_loader_cached_until_user_changes(client):
+    with client.application.app_context():
+        make_user("principal")
+        make_user("principaladmin", role="admin")
+        user_id = User.query.filter_by(username="principal").one().id
+        engine = db.engine
+    client.post("/login", data={"username": "principal", "password": "pass"})
+    client.get("/dashboard")
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert client.get("/dashboard").status_code == 200
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert not any(re.search(r'\bFROM "?user"?\s', s) for s in statements)
+
+    admin = app.test_client()
+    admin.post("/login", data={"username": "principaladmin", "password": "pass"})
+    admin.get(f"/admin/delete/{user_id}")
+    assert client.get("/dashboard").status_code == 302  # сессия удалённого пользователя недействительна
+
+
 # ===================== Работа с ролями =====================
 def test_user_role_user(client):
     client.post("/register", data={"username": "roleuser", "password": "pass"})
@@ -60,6 +118,7 @@ def test_create_workout(client):
 def test_read_workout(client):
     # сначала создаем workout
     with client.application.app_context():
+        add_owner()
         w = Workout(user_id=1, date="2025-12-25", exercise="Squat", sets=3, reps=10, weight=50)
         db.session.add(w)
         db.session.commit()
@@ -71,6 +130,7 @@ def test_read_workout(client):
 
 def test_update_workout(client):
     with client.application.app_context():
+        add_owner()
         w = Workout(user_id=1, date="2025-12-25", exercise="Squat", sets=3, reps=10, weight=50)
         db.session.add(w)
         db.session.commit()
@@ -84,6 +144,7 @@ def test_update_workout(client):
 
 def test_delete_workout(client):
     with client.application.app_context():
+        add_owner()
         w = Workout(user_id=1, date="2025-12-25", exercise="Squat", sets=3, reps=10, weight=50)
         db.session.add(w)
         db.session.commit()
@@ -104,6 +165,7 @@ def test_create_invalid_workout(client):
 
 def test_workout_date(client):
     with client.application.app_context():
+        add_owner()
         w = Workout(user_id=1, date=date.today(), exercise="Bench Press", sets=3, reps=10, weight=50)
         db.session.add(w)
         db.session.commit()
@@ -138,7 +200,7 @@ def test_empty_exercise_name(client):
 
 def test_multiple_workouts(client):
     with client.application.app_context():
-        from app import Workout, db
+        add_owner()
 
         w1 = Workout(user_id=1, date="2025-12-24", exercise="Pull Up", sets=4, reps=8, weight=0)
         w2 = Workout(user_id=1, date="2025-12-24", exercise="Push Up", sets=5, reps=15, weight=0)
@@ -189,6 +251,79 @@ def test_delete_workout_page(client):
     rv = client.get(f"/delete/{w.id}", follow_redirects=True)
     assert rv.status_code in [200, 302]
 
+def test_add_and_edit_reject_blank_exercise(client):
+    client.post("/register", data={"username": "blankuser", "password": "pass"})
+    client.post("/login", data={"username": "blankuser", "password": "pass"})
+    form = {"date": "2025-11-01", "exercise": "Row", "sets": 1, "reps": 1, "weight": 10}
+    client.post("/add", data=form)
+    rv = client.post("/add", data={**form, "exercise": "   "})
+    assert rv.status_code == 400 and "название упражнения пустое" in rv.data.decode()
+    with client.application.app_context():
+        workout_id = Workout.query.one().id
+    assert client.post(f"/edit/{workout_id}", data={**form, "exercise": " "}).status_code == 400
+    assert client.post(f"/edit/{workout_id}", data={**form, "sets": "x"}).status_code == 400
+    assert "<b>Всего тренировок:</b> 1" in client.get("/dashboard").data.decode()
+    with client.application.app_context():
+        assert Workout.query.one().exercise == "Row"
+
+
+def test_exercise_suggestions_are_per_user(client):
+    client.post("/register", data={"username": "suggestown", "password": "pass"})
+    client.post("/login", data={"username": "suggestown", "password": "pass"})
+    client.post("/add", data={"date": "2025-11-01", "exercise": "Секретный жим", "sets": 1, "reps": 1, "weight": 10})
+    assert '<option value="Секретный жим">' in client.get("/add").data.decode()
+    client.get("/logout")
+
+    client.post("/register", data={"username": "suggestnew", "password": "pass"})
+    client.post("/login", data={"username": "suggestnew", "password": "pass"})
+    for url in ("/add", "/statistics"):
+        assert "Секретный жим" not in client.get(url).data.decode()
+
+
+def test_dashboard_pagination(client):
+    client.post("/register", data={"username": "pageuser", "password": "pass"})
+    client.post("/login", data={"username": "pageuser", "password": "pass"})
+    for day in range(1, 6):
+        client.post("/add", data={"date": f"2025-11-{day:02d}", "exercise": "Row", "sets": 1, "reps": 1, "weight": 10})
+
+    app.config['WORKOUTS_PER_PAGE'] = 2
+    try:
+        seen = []
+        url = "/dashboard"
+        while url:
+            html = client.get(url).data.decode()
+            dates = [f"2025-11-{day:02d}" for day in range(5, 0, -1) if f"<td>2025-11-{day:02d}</td>" in html]
+            assert len(dates) <= 2
+            seen.extend(dates)
+            assert "<b>Всего тренировок:</b> 5" in html
+            next_link = [part for part in html.split('"') if part.startswith("/dashboard?cursor=")]
+            url = next_link[0] if next_link else None
+    finally:
+        app.config['WORKOUTS_PER_PAGE'] = 50
+    assert seen == [f"2025-11-{day:02d}" for day in range(5, 0, -1)]
+
+def test_pagination_reaches_workouts_without_date(client):
+    from sqlalchemy import insert
+    from services import workouts_page
+    from catalog import get_catalog
+    with client.application.app_context():
+        add_owner()
+        row_id = get_catalog().exercise_id("Row")
+        db.session.execute(insert(Workout), [
+            {"user_id": 1, "date": day, "exercise_id": row_id, "sets": 1, "reps": 1, "weight": 10}
+            for day in (date(2025, 11, 1), None, date(2025, 11, 2), None, date(2025, 11, 3))
+        ])
+        db.session.commit()
+        for per_page in (1, 2, 3, 4, 5):
+            seen, cursor = [], None
+            while True:
+                page, cursor = workouts_page(1, cursor, per_page)
+                assert page
+                seen.extend(w.id for w in page)
+                if not cursor:
+                    break
+            assert seen == [5, 3, 1, 4, 2]  # без даты — в конце, новые первыми
+
 # ===================== Прогресс и статистика =====================
 def test_progress_page(client):
     client.post("/register", data={"username": "puser", "password": "pass"})
@@ -202,6 +337,863 @@ def test_statistics_page(client):
     rv = client.get("/statistics")
     assert rv.status_code in [200, 302]
 
+# ===================== Панель тренера =====================
+def count_queries(client, url):
+    queries = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", on_execute)
+    try:
+        rv = client.get(url)
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+    assert rv.status_code == 200
+    return len(queries)
+
+
+def add_athlete(name, workouts=3, coach_id=None):
+    user = User(username=name, role="user")
+    user.set_password("pass")
+    db.session.add(user)
+    db.session.flush()
+    if coach_id:
+        db.session.add(CoachAthlete(coach_id=coach_id, athlete_id=user.id))
+    for i in range(workouts):
+        w = Workout(user_id=user.id, date=f"2025-12-{i + 1:02d}", exercise="Squat", sets=3, reps=5, weight=100)
+        db.session.add(w)
+        db.session.flush()
+        db.session.add(Comment(workout_id=w.id, coach_id=None, content="ok", date="2025-12-31"))
+    db.session.commit()
+
+
+def test_coach_dashboard_constant_queries(client):
+    with client.application.app_context():
+        coach = User(username="coachq", role="coach")
+        coach.set_password("pass")
+        db.session.add(coach)
+        db.session.commit()
+        coach_id = coach.id
+        add_athlete("athlete1", coach_id=coach_id)
+    client.post("/login", data={"username": "coachq", "password": "pass"})
+    client.get("/coach")  # первый запрос загружает каталог упражнений
+    small = count_queries(client, "/coach")
+
+    with client.application.app_context():
+        for i in range(2, 6):
+            add_athlete(f"athlete{i}", workouts=5, coach_id=coach_id)
+        add_athlete("stranger", workouts=7)  # чужой спортсмен
+    large = count_queries(client, "/coach")
+
+    assert large == small
+    html = client.get("/coach").data.decode()
+    assert html.count("<p>ok (2025-12-31)</p>") == 3 + 4 * 5
+    assert "stranger" not in html
+
+
+def test_coach_scoped_to_assigned_athletes(client):
+    from services import create_workout
+    with client.application.app_context():
+        make_user("rosteradmin", role="admin")
+        coach_id = make_user("rostercoach", role="coach")
+        mine = make_user("mine")
+        other = make_user("other")
+        other_workout = create_workout(other, "2025-12-01", "Squat", 1, 1, 100).id
+
+    client.post("/login", data={"username": "rosteradmin", "password": "pass"})
+    client.post("/admin/coaches", data={"coach_id": coach_id, "athlete_id": mine, "action": "add"})
+    client.post("/admin/coaches", data={"coach_id": coach_id, "athlete_id": other, "action": "add"})
+    client.post("/admin/coaches", data={"coach_id": coach_id, "athlete_id": other, "action": "remove"})
+    assert client.post("/admin/coaches", data={"coach_id": mine, "athlete_id": other}).status_code == 400
+    html = client.get("/admin/coaches").data.decode()
+    assert "Открепить" in html and html.count("Открепить") == 1
+    client.get("/logout")
+
+    client.post("/login", data={"username": "rostercoach", "password": "pass"})
+    html = client.get("/coach").data.decode()
+    assert "<h3>mine</h3>" in html and "<h3>other</h3>" not in html
+    assert "other" not in client.get(f"/coach?athlete={other}").data.decode()
+    rv = client.post(f"/coach/comment/{other_workout}", data={"content": "чужой"})
+    assert rv.status_code == 403
+    feed = client.get("/coach/feed?cursor=0&wait=0").get_json()
+    assert feed["changes"] == [] and feed["cursor"] > 0  # чужие записи курсор пропускает
+
+
+def test_coach_bulk_comments(client):
+    from models import ChangeLog
+    with client.application.app_context():
+        coach = User(username="bulkcoach", role="coach")
+        coach.set_password("pass")
+        db.session.add(coach)
+        db.session.commit()
+        add_athlete("bulk1", workouts=10, coach_id=coach.id)
+        add_athlete("bulk2", workouts=10, coach_id=coach.id)
+        add_athlete("bulkother", workouts=1)
+        ids = {name: [w.id for w in Workout.query.join(User).filter(User.username == name).order_by(Workout.id)]
+               for name in ("bulk1", "bulk2", "bulkother")}
+    client.post("/login", data={"username": "bulkcoach", "password": "pass"})
+    assert 'name="comment-%d"' % ids["bulk1"][0] in client.get("/coach").data.decode()
+
+    def post_comments(workout_ids):
+        queries = []
+        with client.application.app_context():
+            engine = db.engine
+        listener = lambda conn, cursor, statement, *args: queries.append(statement)
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            rv = client.post("/coach/comments", json={"comments": [
+                {"workout_id": i, "content": f"разбор {i}"} for i in workout_ids]})
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+        return rv, len(queries)
+
+    rv, small = post_comments([ids["bulk1"][0], ids["bulk2"][0]])
+    assert rv.status_code == 200
+    rv, large = post_comments(ids["bulk1"][1:] + ids["bulk2"][1:])
+    assert large == small  # число запросов не зависит от числа комментариев
+    workouts = rv.get_json()["workouts"]
+    assert len(workouts) == 18 and {w["athlete"] for w in workouts} == {"bulk1", "bulk2"}
+    assert workouts[0]["comments"][-1]["content"] == f"разбор {workouts[0]['id']}"
+
+    # чужая тренировка в пачке — не сохраняется ничего
+    with client.application.app_context():
+        before = Comment.query.count(), ChangeLog.query.count()
+    rv, _ = post_comments([ids["bulk1"][0], ids["bulkother"][0]])
+    assert rv.status_code == 403
+    with client.application.app_context():
+        assert (Comment.query.count(), ChangeLog.query.count()) == before
+
+    # форма со страницы тренера: пустые поля пропускаются, в ответе только затронутые тренировки
+    html = client.post("/coach/comments", data={f"comment-{ids['bulk2'][3]}": "Держи спину",
+                                                f"comment-{ids['bulk2'][4]}": " "}).data.decode()
+    assert "Сохранено комментариев: 1" in html and "Держи спину" in html and "bulk1" not in html
+    assert client.post("/coach/comments", json={"comments": "x"}).status_code == 400
+    assert client.post("/coach/comments", json=[{"workout_id": ids["bulk1"][0], "content": "x"}]).status_code == 400
+
+
+def test_monthly_volume(client):
+    import stats
+    with client.application.app_context():
+        add_owner(7)
+        add_owner(8)
+        db.session.add_all([
+            Workout(user_id=7, date="2025-01-15", exercise="Squat", sets=3, reps=5, weight=100),
+            Workout(user_id=7, date="2025-01-20", exercise="Bench", sets=2, reps=5, weight=50),
+            Workout(user_id=7, date="2025-03-01", exercise="Squat", sets=1, reps=1, weight=120),
+            Workout(user_id=7, date="2024-12-31", exercise="Squat", sets=1, reps=1, weight=999),
+            Workout(user_id=8, date="2025-01-15", exercise="Squat", sets=1, reps=1, weight=999),
+        ])
+        db.session.commit()
+
+        monthly = stats.monthly_volume(7, 2025)
+        assert monthly[1] == 1500 + 500
+        assert monthly[3] == 120
+        assert sum(monthly.values()) == 2120
+        assert stats.user_totals(7) == (4, 2120 + 999)
+
+        # сводки, из которых читают страницы, совпадают с подсчётом по тренировкам
+        stats.rebuild_rollups()
+        db.session.commit()
+        assert stats.rollup_monthly(7, 2025) == monthly
+        assert tuple(stats.rollup_totals(7)) == stats.user_totals(7)
+
+def test_coach_feed_long_poll_and_stream(client):
+    from services import create_workout, update_workout
+    with client.application.app_context():
+        athlete_id = make_user("feedathlete")
+        db.session.add(CoachAthlete(coach_id=make_user("feedcoach", role="coach"), athlete_id=athlete_id))
+        db.session.commit()
+        workout = create_workout(athlete_id, "2025-12-01", "Squat", 3, 5, 100)
+        update_workout(workout, "2025-12-01", "Squat", 3, 5, 105)
+        workout_id = workout.id
+
+    assert client.get("/coach/feed").status_code == 302  # без входа
+    client.post("/login", data={"username": "feedcoach", "password": "pass"})
+    client.post(f"/coach/comment/{workout_id}", data={"content": "Молодец"})
+
+    rv = client.get("/coach/feed?cursor=0&wait=0").get_json()
+    assert [c["kind"] for c in rv["changes"]] == ["workout_added", "workout_updated", "comment_added"]
+    assert rv["changes"][1]["workout"]["weight"] == 105
+    assert rv["changes"][2]["comment"] == "Молодец" and rv["changes"][2]["athlete"] == "feedathlete"
+
+    started = time.monotonic()
+    empty = client.get(f"/coach/feed?cursor={rv['cursor']}&wait=0.3").get_json()
+    assert empty == {"changes": [], "cursor": rv["cursor"]}
+    assert time.monotonic() - started >= 0.3
+    assert client.get(f"/coach/feed?cursor={rv['cursor']}&wait=nan").status_code == 400
+
+    app.config['FEED_STREAM_SECONDS'] = 0.2
+    try:
+        body = client.get("/coach/feed/stream", headers={"Last-Event-ID": str(rv["changes"][0]["id"])}).data.decode()
+    finally:
+        app.config['FEED_STREAM_SECONDS'] = 300
+    assert f"id: {rv['cursor']}\nevent: change\n" in body
+    assert "workout_added" not in body
+
+
+# ===================== Сводные таблицы =====================
+def rollup_snapshot():
+    months = sorted((r.user_id, r.year, r.month, r.workouts, r.volume) for r in MonthlyVolume.query.all())
+    exercises = sorted((r.user_id, r.exercise, r.workouts, r.volume, r.best_weight, r.last_weight,
+                        r.last_date, r.last_workout_id) for r in ExerciseStats.query.all())
+    weeks = sorted((r.user_id, r.exercise, r.week, r.workouts, r.best_weight, round(r.best_e1rm, 6))
+                   for r in ExerciseWeek.query.all())
+    return months, exercises, weeks
+
+
+def test_rollups_follow_writes(client):
+    from stats import rebuild_rollups
+    client.post("/register", data={"username": "rolluser", "password": "pass"})
+    client.post("/login", data={"username": "rolluser", "password": "pass"})
+    for day, exercise, weight in [("2025-01-10", "Squat", 100), ("2025-01-20", "Squat", 120),
+                                  ("2025-02-05", "Squat", 110), ("2025-02-06", "Bench", 60)]:
+        client.post("/add", data={"date": day, "exercise": exercise, "sets": 2, "reps": 5, "weight": weight})
+
+    with client.application.app_context():
+        best = ExerciseStats.query.filter_by(user_id=1, exercise="Squat").one()
+        assert (best.workouts, best.best_weight, best.last_weight) == (3, 120, 110)
+        squat_ids = [w.id for w in Workout.query.filter_by(exercise="Squat").order_by(Workout.date)]
+
+    # лучший результат переносим в другое упражнение, последний удаляем
+    client.post(f"/edit/{squat_ids[1]}", data={"date": "2025-03-01", "exercise": "Bench", "sets": 2, "reps": 5, "weight": 70})
+    client.get(f"/delete/{squat_ids[2]}")
+
+    with client.application.app_context():
+        squat = ExerciseStats.query.filter_by(user_id=1, exercise="Squat").one()
+        assert (squat.workouts, squat.best_weight, squat.last_weight) == (1, 100, 100)
+        bench = ExerciseStats.query.filter_by(user_id=1, exercise="Bench").one()
+        assert (bench.workouts, bench.last_weight, bench.volume) == (2, 70, 1300)
+        assert db.session.get(MonthlyVolume, (1, 2025, 2)).workouts == 1
+
+        incremental = rollup_snapshot()
+        rebuild_rollups()
+        db.session.commit()
+        assert rollup_snapshot() == incremental
+
+    html = client.get("/dashboard").data.decode()
+    assert "<b>Всего тренировок:</b> 3" in html
+
+def test_progress_series_downsampled_with_records(client):
+    import stats
+    from datetime import timedelta
+    from sqlalchemy import insert
+    from catalog import get_catalog
+    with client.application.app_context():
+        add_owner()
+        squat_id = get_catalog().exercise_id("Squat")
+        start = date(2020, 1, 6)
+        # три года ежедневных тренировок, рекорд каждые 100 дней
+        db.session.execute(insert(Workout), [
+            {"user_id": 1, "date": start + timedelta(days=i), "exercise_id": squat_id, "sets": 1,
+             "reps": 5 if i % 100 == 0 else 3, "weight": 100 + i // 100 + (i % 7)}
+            for i in range(3 * 365)
+        ])
+        stats.rebuild_rollups(1)
+        db.session.commit()
+        assert ExerciseWeek.query.count() == 157
+
+        series = stats.progress_series(1, 40)["Squat"]
+        points = series["points"]
+        assert len(points) == 40
+        assert points[0]["week"] == start and points[-1]["week"] == stats.week_of(start + timedelta(days=3 * 365 - 1))
+        assert sum(p["pr"] for p in points) >= 5
+        assert series["best_e1rm"] == pytest.approx(stats.estimated_1rm(116, 5))
+        assert len(stats.progress_series(1, 500)["Squat"]["points"]) == 157
+
+def test_chart_asset_and_series(client):
+    client.post("/register", data={"username": "chartuser", "password": "pass"})
+    client.post("/login", data={"username": "chartuser", "password": "pass"})
+    client.post("/add", data={"date": "2025-03-01", "exercise": "Squat", "sets": 2, "reps": 5, "weight": 100})
+
+    page = client.get("/statistics?year=2025").data.decode()
+    assert "cdn.jsdelivr" not in page
+    url = re.search(r'src="(/assets/chart\.[0-9a-f]{10}\.js)"', page).group(1)
+    rv = client.get(url)
+    assert rv.status_code == 200
+    assert "immutable" in rv.headers["Cache-Control"] and "max-age=31536000" in rv.headers["Cache-Control"]
+    assert client.get("/assets/chart.0000000000.js").status_code == 404
+    assert client.get("/assets/..%2Fapp.py").status_code == 404
+
+    monthly = client.get("/api/v1/charts/monthly?year=2025")
+    assert monthly.headers["ETag"]
+    assert monthly.json["series"][0]["values"][2] == 1000
+    assert len(monthly.json["labels"]) == 12
+    chart = client.get("/api/v1/charts/progress").json["charts"][0]
+    assert chart["title"] == "Squat" and chart["series"][1]["values"] == [100]
+
+def test_range_statistics_and_heatmap(client):
+    import stats
+    from datetime import timedelta
+    from sqlalchemy import insert
+    from catalog import get_catalog
+    client.post("/register", data={"username": "rangeuser", "password": "pass"})
+    client.post("/login", data={"username": "rangeuser", "password": "pass"})
+    with client.application.app_context():
+        user_id = User.query.filter_by(username="rangeuser").one().id
+        squat_id, bench_id = get_catalog().exercise_id("Squat"), get_catalog().exercise_id("Bench")
+        start = date(2021, 12, 20)
+        # 2021-12-20 … 2023-01-09: присед каждый день (объём 100), жим по понедельникам (объём 50)
+        rows = [{"user_id": user_id, "date": start + timedelta(days=i), "exercise_id": squat_id,
+                 "sets": 1, "reps": 1, "weight": 100} for i in range(386)]
+        rows += [{"user_id": user_id, "date": start + timedelta(days=i), "exercise_id": bench_id,
+                  "sets": 1, "reps": 1, "weight": 50} for i in range(0, 386, 7)]
+        db.session.execute(insert(Workout), rows)
+        stats.rebuild_rollups(user_id)
+        db.session.commit()
+
+        # неполные месяцы по краям считаются по тренировкам, остальное — из MonthlyVolume
+        months = stats.range_volume(user_id, date(2022, 1, 15), date(2022, 12, 31), "month")
+        assert [m["start"].month for m in months] == list(range(1, 13))
+        assert months[0]["workouts"] == 17 + 3 and months[1]["volume"] == 28 * 100 + 4 * 50
+        years = stats.range_volume(user_id, date(2021, 1, 1), date(2023, 12, 31), "year")
+        assert [y["workouts"] for y in years] == [12 + 2, 365 + 52, 9 + 2]
+        weeks = stats.range_volume(user_id, date(2022, 1, 1), date(2022, 1, 16), "week", bench_id)
+        assert [(w["start"], w["volume"]) for w in weeks] == [
+            (date(2021, 12, 27), 0), (date(2022, 1, 3), 50), (date(2022, 1, 10), 50)]
+
+        daily = stats.daily_volume(user_id, date(2022, 1, 3), date(2022, 1, 5))
+        assert daily == {date(2022, 1, 3): 150, date(2022, 1, 4): 100, date(2022, 1, 5): 100}
+        heat = stats.calendar_heatmap(daily, date(2022, 1, 1), date(2022, 1, 5))
+        assert heat[0][:5] == [None] * 5 and heat[0][5]["level"] == 0
+        assert heat[1][0]["level"] == 4 and heat[1][1]["level"] == 3 and heat[1][3] is None
+
+    rv = client.get("/api/v1/stats/volume?from=2022-01-01&to=2022-12-31&period=year&exercise=bench")
+    assert rv.json["buckets"] == [{"start": "2022-01-01", "workouts": 52, "volume": 2600}]
+    assert client.get("/api/v1/stats/volume?from=2000-01-01&to=2030-01-01&period=week").status_code == 400
+    assert client.get("/api/v1/stats/volume?period=day").status_code == 400
+    for edge in ("from=9999-01-01&to=9999-12-31", "from=0001-01-01&to=0001-12-31", "year=9999"):
+        assert client.get(f"/api/v1/stats/volume?{edge}").status_code == 400
+        assert client.get(f"/statistics?{edge}").status_code == 200
+    days = client.get("/api/v1/stats/calendar?from=2022-01-03&to=2022-01-04").json["days"]
+    assert days == {"2022-01-03": 150, "2022-01-04": 100}
+    assert len(client.get("/api/v1/charts/volume?year=2022&period=week").json["labels"]) == 53
+    assert client.get("/statistics?endpoint=x&_external=1&_anchor=a").status_code == 200
+    page = client.get("/statistics?year=2022").data.decode()
+    assert page.count('class="heat-') == 53 * 7 and "heat-4" in page
+
+# ===================== Импорт =====================
+def test_import_csv_upload(client):
+    import io
+    client.post("/register", data={"username": "impuser", "password": "pass"})
+    client.post("/login", data={"username": "impuser", "password": "pass"})
+    csv_data = ("date,exercise,sets,reps,weight\n"
+                "2025-06-01,Squat,3,5,100\n"
+                "2025-06-02,Squat,3,five,100\n"
+                "01.06.2025,Bench,3,5,60\n"
+                "2025-06-03,Bench,3,5,62.5\n")
+    rv = client.post("/import", data={"file": (io.BytesIO(csv_data.encode()), "history.csv")},
+                     content_type="multipart/form-data")
+    html = rv.data.decode()
+    assert "<b>Импортировано:</b> 2" in html
+    assert "<b>Ошибок:</b> 2" in html
+    assert "<td>3</td>" in html and "<td>4</td>" in html
+
+    with client.application.app_context():
+        assert Workout.query.count() == 2
+        assert ExerciseStats.query.filter_by(user_id=1, exercise="Bench").one().last_weight == 62.5
+
+
+def test_import_jsonl_batches(client):
+    import io
+    from services import import_workouts
+    lines = [f'{{"date": "2025-07-{day:02d}", "exercise": "Row", "sets": 1, "reps": 1, "weight": {day}}}'
+             for day in range(1, 8)]
+    lines.insert(3, "not json")
+    with client.application.app_context():
+        add_owner(5)
+        result = import_workouts(5, io.StringIO("\n".join(lines)), "jsonl", batch_size=3)
+        assert result.imported == 7
+        assert result.errors == [(4, "строка не разобрана")]
+        assert db.session.get(MonthlyVolume, (5, 2025, 7)).workouts == 7
+
+def test_import_broken_encoding_keeps_committed_batches(client):
+    import io
+    client.post("/register", data={"username": "brokenimp", "password": "pass"})
+    client.post("/login", data={"username": "brokenimp", "password": "pass"})
+    rows = "".join(f"2025-06-{day % 28 + 1:02d},Squat,1,1,{day}\n" for day in range(600))
+    data = ("date,exercise,sets,reps,weight\n" + rows).encode() + b"2025-06-01,\xff\xfe,1,1,1\n"
+    app.config['IMPORT_BATCH_SIZE'] = 100
+    try:
+        rv = client.post("/import", data={"file": (io.BytesIO(data), "history.csv")},
+                         content_type="multipart/form-data")
+    finally:
+        app.config['IMPORT_BATCH_SIZE'] = 1000
+    assert rv.status_code == 200
+    html = rv.data.decode()
+    assert "файл не читается дальше" in html
+    imported = int(re.search(r"<b>Импортировано:</b> (\d+)", html).group(1))
+    assert 300 <= imported < 600
+    # сводки и кэш дашборда учитывают уже сохранённые пачки
+    assert f"<b>Всего тренировок:</b> {imported}" in client.get("/dashboard").data.decode()
+
+
+# ===================== Выгрузка =====================
+def test_export_jsonl_and_gzip_csv(client):
+    import gzip
+    import json
+    client.post("/register", data={"username": "expuser", "password": "pass"})
+    client.post("/login", data={"username": "expuser", "password": "pass"})
+    client.post("/add", data={"date": "2025-08-02", "exercise": "Squat", "sets": 3, "reps": 5, "weight": 100})
+    client.post("/add", data={"date": "2025-08-01", "exercise": "Bench", "sets": 3, "reps": 5, "weight": 60})
+    with client.application.app_context():
+        squat = Workout.query.filter_by(exercise="Squat").first()
+        db.session.add_all([Comment(workout_id=squat.id, coach_id=None, content="глубже", date="2025-08-03"),
+                            Comment(workout_id=squat.id, coach_id=None, content="отлично", date="2025-08-04")])
+        db.session.commit()
+
+    rv = client.get("/export/jsonl")
+    assert rv.is_streamed
+    rows = [json.loads(line) for line in rv.data.decode().splitlines()]
+    assert [r["exercise"] for r in rows] == ["Bench", "Squat"]
+    assert [c["content"] for c in rows[1]["comments"]] == ["глубже", "отлично"]
+
+    rv = client.get("/export/csv?gzip=1")
+    assert "workouts.csv.gz" in rv.headers["Content-Disposition"]
+    lines = gzip.decompress(rv.data).decode().splitlines()
+    assert lines[0] == "date,exercise,sets,reps,weight,comments"
+    assert lines[1] == "2025-08-01,Bench,3,5,60.0,"
+
+    assert client.get("/export/xml").status_code == 404
+
+# ===================== JSON API =====================
+def test_api_workouts_crud_and_etag(client):
+    assert client.get("/api/v1/workouts").status_code == 401
+    client.post("/register", data={"username": "apiuser", "password": "pass"})
+    client.post("/login", data={"username": "apiuser", "password": "pass"})
+
+    rv = client.post("/api/v1/workouts", json={"date": "2025-09-01", "exercise": "Squat", "sets": 3, "reps": 5, "weight": 100})
+    assert rv.status_code == 201
+    workout_id = rv.get_json()["id"]
+    assert client.post("/api/v1/workouts", json={"date": "вчера"}).status_code == 400
+    valid = {"date": "2025-09-02", "exercise": "Squat", "sets": 3, "reps": 5, "weight": 100}
+    for bad in ({"weight": "nan"}, {"weight": "inf"}, {"weight": 1e309}, {"weight": True},
+                {"sets": 2.9}, {"reps": True}, {"sets": "2.9"}):
+        assert client.post("/api/v1/workouts", json={**valid, **bad}).status_code == 400
+    assert client.post("/add", data={**valid, "weight": "nan"}).status_code == 400
+    assert client.post("/api/v1/workouts", json=[valid]).status_code == 400
+    assert client.put(f"/api/v1/workouts/{workout_id}", json="Squat").status_code == 400
+
+    rv = client.get("/api/v1/workouts")
+    etag = rv.headers["ETag"]
+    assert [w["exercise"] for w in rv.get_json()["items"]] == ["Squat"]
+    assert client.get("/api/v1/workouts", headers={"If-None-Match": etag}).status_code == 304
+
+    rv = client.put(f"/api/v1/workouts/{workout_id}",
+                    json={"date": "2025-09-01", "exercise": "Squat", "sets": 3, "reps": 5, "weight": 105})
+    assert rv.get_json()["weight"] == 105
+    rv = client.get("/api/v1/workouts", headers={"If-None-Match": etag})
+    assert rv.status_code == 200 and rv.headers["ETag"] != etag
+
+    stats = client.get("/api/v1/statistics?year=2025").get_json()
+    assert stats["months"]["9"] == 105 * 15
+    progress = client.get("/api/v1/progress").get_json()
+    assert progress["series"]["Squat"] == [["2025-09-01", 105]]
+
+    assert client.delete(f"/api/v1/workouts/{workout_id}").status_code == 204
+    assert client.get(f"/api/v1/workouts/{workout_id}").status_code == 404
+
+def test_search_index_follows_writes(client):
+    from services import create_workout, update_workout, remove_workout, add_comment, search_workouts
+    with client.application.app_context():
+        user_id = make_user("finder")
+        other_id = make_user("stranger")
+        coach_id = make_user("findcoach", role="coach")
+        bench = create_workout(user_id, "2025-03-01", "Жим лёжа", 3, 5, 80)
+        squat = create_workout(user_id, "2025-03-02", "Присед", 3, 5, 120)
+        create_workout(other_id, "2025-03-03", "Жим лёжа", 3, 5, 90)
+        add_comment(squat.id, coach_id, "Отличная техника")
+
+        def found(text=None, **filters):
+            return [w.exercise for w in search_workouts(user_id, text, **filters)[0]]
+
+        assert found("леж") == ["Жим лёжа"]  # ё = е, префикс, только свои
+        assert found("ТЕХНИК") == ["Присед"]
+        assert found("техник", weight_max=100) == []
+        assert found(date_from=date(2025, 3, 2)) == ["Присед"]
+        update_workout(bench, date="2025-03-01", exercise="Тяга", sets=3, reps=5, weight=80)
+        assert found("жим") == [] and found("тяга") == ["Тяга"]
+        remove_workout(squat)
+        assert found("техник") == []
+
+    client.post("/login", data={"username": "finder", "password": "pass"})
+    items = client.get("/api/v1/search?q=тяг&weight_min=50").get_json()["items"]
+    assert [w["exercise"] for w in items] == ["Тяга"]
+    assert client.get("/api/v1/search?date_from=вчера").status_code == 400
+    assert "Тяга" in client.get("/search?q=тяга").data.decode()
+    client.post("/add", data={"date": "2025-03-04", "exercise": "Тяга", "sets": 1, "reps": 1, "weight": 90})
+    app.config['WORKOUTS_PER_PAGE'] = 1
+    try:
+        html = client.get("/search?q=тяга&endpoint=x&_external=1").data.decode()
+    finally:
+        app.config['WORKOUTS_PER_PAGE'] = 50
+    assert "/search?cursor=" in html and "endpoint" not in html
+
+def test_exercise_catalog_dedup_and_merge(client):
+    from models import Exercise
+    from services import create_workout, merge_exercises, search_workouts
+    with client.application.app_context():
+        user_id = make_user("cataloguser")
+        ids = {create_workout(user_id, "2025-04-01", name, 1, 1, 100).exercise_id
+               for name in ("Squat", "squat ", "SQUAT")}
+        assert len(ids) == 1 and Exercise.query.one().name == "Squat"
+        create_workout(user_id, "2025-04-02", "Присед", 1, 1, 110)
+        assert ExerciseStats.query.filter_by(user_id=user_id).count() == 2
+
+        assert merge_exercises("Squat", ["присед", "Приседания"]) == 1
+        assert [e.name for e in Exercise.query] == ["Squat"]
+        stats_row = ExerciseStats.query.filter_by(user_id=user_id).one()
+        assert (stats_row.exercise, stats_row.workouts, stats_row.best_weight) == ("Squat", 4, 110)
+        assert create_workout(user_id, "2025-04-03", "Приседания", 1, 1, 90).exercise == "Squat"
+        assert len(search_workouts(user_id, "присед")[0]) == 5
+        assert len(search_workouts(user_id, exercise="squat")[0]) == 5
+
+
+def test_merge_seen_by_other_workers(tmp_path):
+    from services import create_workout, merge_exercises
+    uri = f"sqlite:///{tmp_path / 'catalog.db'}"
+    web = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': uri})
+    cli = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': uri})
+    with web.app_context():
+        db.create_all()
+        user_id = make_user("workeruser")
+        create_workout(user_id, "2025-04-01", "Squat", 1, 1, 100)
+        create_workout(user_id, "2025-04-02", "Присед", 1, 1, 110)
+        create_workout(user_id, "2025-04-02", "Присед", 1, 1, 105)  # теперь оба id в словарях воркера
+
+    with cli.app_context():
+        assert merge_exercises("Squat", ["Присед"]) == 2
+
+    with web.app_context():
+        # без сверки версии воркер до EXERCISE_CATALOG_TTL ссылался бы на удалённое упражнение
+        assert create_workout(user_id, "2025-04-03", "Присед", 1, 1, 120).exercise == "Squat"
+        assert ExerciseStats.query.filter_by(user_id=user_id).one().workouts == 4
+
+# ===================== Кэш страниц =====================
+def test_progress_cache_invalidated_by_writes(client):
+    client.post("/register", data={"username": "cacheuser", "password": "pass"})
+    client.post("/login", data={"username": "cacheuser", "password": "pass"})
+    client.post("/add", data={"date": "2025-05-01", "exercise": "Squat", "sets": 1, "reps": 1, "weight": 80})
+
+    hits = response_cache.hits
+    first = client.get("/progress").data.decode()
+    assert client.get("/progress").data.decode() == first
+    assert response_cache.hits == hits + 1
+
+    client.post("/add", data={"date": "2025-05-02", "exercise": "Squat", "sets": 1, "reps": 1, "weight": 85})
+    assert "85.0 кг" in client.get("/progress").data.decode()
+
+
+def test_memory_cache_lru_and_ttl():
+    from cache import MemoryCache
+    cache = MemoryCache(max_entries=2, ttl=60)
+    cache.set(1, "a", "A")
+    cache.set(1, "b", "B")
+    assert cache.get(1, "a") == "A"  # "a" становится свежей записью
+    cache.set(2, "c", "C")
+    assert cache.get(1, "b") is None
+    assert cache.stats()["evictions"] == 1
+
+    cache.invalidate_user(1)
+    assert cache.get(1, "a") is None
+    assert cache.get(2, "c") == "C"
+
+    cache.ttl = -1
+    cache.set(3, "d", "D")
+    assert cache.get(3, "d") is None
+
+
+def test_sqlite_cache_shared_between_instances(tmp_path):
+    from cache import SQLiteCache
+    path = str(tmp_path / "cache.db")
+    writer = SQLiteCache(path, max_entries=2)
+    reader = SQLiteCache(path, max_entries=2)
+    writer.set(1, "progress", "<html>")
+    assert reader.get(1, "progress") == "<html>"
+    reader.invalidate_user(1)
+    assert writer.get(1, "progress") is None
+    for key in "xyz":
+        writer.set(2, key, key)
+    assert writer.stats()["size"] == 2
+
+# ===================== Удаление пользователей =====================
+def make_user(username, role="user"):
+    user = User(username=username, role=role)
+    user.set_password("pass")
+    db.session.add(user)
+    db.session.commit()
+    return user.id
+
+
+def test_admin_delete_user_cascades(client):
+    from services import create_workout
+    with client.application.app_context():
+        make_user("boss", role="admin")
+        coach_id = make_user("coachdel", role="coach")
+        athlete_id = make_user("athdel")
+        other_id = make_user("athother")
+        for day in range(1, 4):
+            w = create_workout(athlete_id, f"2025-10-{day:02d}", "Squat", 1, 1, 100)
+            db.session.add(Comment(workout_id=w.id, coach_id=coach_id, content="ok", date="2025-10-05"))
+        other = create_workout(other_id, "2025-10-01", "Bench", 1, 1, 50)
+        db.session.add(Comment(workout_id=other.id, coach_id=coach_id, content="ok", date="2025-10-05"))
+        db.session.commit()
+
+    client.post("/login", data={"username": "boss", "password": "pass"})
+    client.get(f"/admin/delete/{coach_id}")
+    with client.application.app_context():
+        assert Comment.query.count() == 0
+        assert Workout.query.count() == 4
+
+    client.get(f"/admin/delete/{athlete_id}")
+    with client.application.app_context():
+        assert db.session.get(User, athlete_id) is None
+        assert Workout.query.filter_by(user_id=athlete_id).count() == 0
+        assert ExerciseStats.query.filter_by(user_id=athlete_id).count() == 0
+        assert MonthlyVolume.query.filter_by(user_id=athlete_id).count() == 0
+        assert Workout.query.filter_by(user_id=other_id).count() == 1
+
+
+def test_background_purge_in_batches(client):
+    from services import create_workout, start_background_purge
+    with client.application.app_context():
+        athlete_id = make_user("heavy")
+        coach_id = make_user("coachheavy", role="coach")
+        for day in range(1, 8):
+            w = create_workout(athlete_id, f"2025-10-{day:02d}", "Squat", 1, 1, 100)
+            db.session.add(Comment(workout_id=w.id, coach_id=coach_id, content="ok", date="2025-10-09"))
+        db.session.commit()
+
+    app.config['PURGE_BATCH_SIZE'] = 2
+    try:
+        with app.app_context():
+            thread = start_background_purge(athlete_id)
+        thread.join(timeout=10)
+    finally:
+        app.config['PURGE_BATCH_SIZE'] = 5000
+
+    with client.application.app_context():
+        db.session.expire_all()
+        assert db.session.get(User, athlete_id) is None
+        assert Workout.query.count() == 0
+        assert Comment.query.count() == 0
+        assert db.session.get(User, coach_id) is not None
+
+def test_interrupted_purge_logged_and_retried(client, monkeypatch, caplog):
+    import threading
+    import services
+    with client.application.app_context():
+        make_user("bossretry", role="admin")
+        athlete_id = make_user("halfdeleted")
+        services.create_workout(athlete_id, "2025-10-01", "Squat", 1, 1, 100)
+        db.session.get(User, athlete_id).role = 'deleting'
+        db.session.commit()
+
+    def broken_purge(user_id, batch_size=None):
+        raise RuntimeError("воркер остановлен")
+    with monkeypatch.context() as patch:
+        patch.setattr(services, "purge_user", broken_purge)
+        with app.app_context():
+            services.start_background_purge(athlete_id).join(timeout=10)
+    assert "Фоновое удаление пользователя" in caplog.text and "воркер остановлен" in caplog.text
+    client.post("/login", data={"username": "bossretry", "password": "pass"})
+
+    # пока удаление идёт, второе не запускается и ссылки повтора нет
+    release, calls = threading.Event(), []
+
+    def slow_purge(user_id, batch_size=None):
+        calls.append(user_id)
+        release.wait(timeout=10)
+    with monkeypatch.context() as patch:
+        patch.setattr(services, "purge_user", slow_purge)
+        with app.app_context():
+            thread = services.start_background_purge(athlete_id)
+            assert services.start_background_purge(athlete_id) is None
+        client.get(f"/admin/delete/{athlete_id}")
+        assert "Повторить удаление" not in client.get("/admin").data.decode()
+        release.set()
+        thread.join(timeout=10)
+    assert calls == [athlete_id]
+
+    # пользователь застрял в 'deleting' — админ запускает удаление снова
+    assert "Повторить удаление" in client.get("/admin").data.decode()
+    client.get(f"/admin/delete/{athlete_id}")
+    for thread in threading.enumerate():
+        if thread.name == f"purge-user-{athlete_id}":
+            thread.join(timeout=10)
+    with client.application.app_context():
+        assert db.session.get(User, athlete_id) is None
+        assert Workout.query.count() == 0
+
+# ===================== Миграция дат =====================
+def test_migrate_dates(client):
+    import click
+    from sqlalchemy import text
+    from commands import migrate_dates
+    with client.application.app_context():
+        add_owner()
+        with db.engine.begin() as conn:
+            conn.execute(text("DROP TABLE comment"))
+            conn.execute(text("DROP TABLE workout"))
+            conn.execute(text("CREATE TABLE workout (id INTEGER PRIMARY KEY, user_id INTEGER, date VARCHAR(20), "
+                              "exercise VARCHAR(100), sets INTEGER, reps INTEGER, weight FLOAT)"))
+            conn.execute(text("CREATE TABLE comment (id INTEGER PRIMARY KEY, workout_id INTEGER, coach_id INTEGER, "
+                              "content VARCHAR(500), date VARCHAR(20))"))
+            conn.execute(text("INSERT INTO workout VALUES (1, 1, '2025-12-25', 'Squat', 3, 5, 100), "
+                              "(2, 1, '24.12.2025', 'Squat', 3, 5, 90), (3, 1, 'вчера', ' squat', 1, 1, 1)"))
+            conn.execute(text("INSERT INTO comment VALUES (1, 2, 2, 'ok', '2025/12/26')"))
+
+        # нераспознанная дата: миграция ничего не трогает и перечисляет строки
+        with pytest.raises(click.ClickException, match=r"workout id=3: 'вчера'"):
+            migrate_dates()
+        with db.engine.begin() as conn:
+            assert conn.execute(text("SELECT date FROM workout WHERE id = 2")).scalar() == "24.12.2025"
+            conn.execute(text("UPDATE workout SET date = '23.12.2025' WHERE id = 3"))
+
+        migrate_dates()
+        migrate_dates()  # повторный запуск ничего не ломает
+
+        with db.engine.connect() as conn:
+            types = {row.name: row.type for row in conn.execute(text("PRAGMA table_info(workout)"))}
+            indexes = {row.name for row in conn.execute(text("PRAGMA index_list(workout)"))}
+        assert types["date"] == "DATE"
+        assert {"ix_workout_user_date", "ix_workout_user_exercise_date"} <= indexes
+
+        db.session.expire_all()
+        assert db.session.get(Workout, 1).date == date(2025, 12, 25)
+        assert db.session.get(Workout, 2).date == date(2025, 12, 24)
+        assert db.session.get(Workout, 3).date == date(2025, 12, 23)
+        assert db.session.get(Comment, 1).date == date(2025, 12, 26)
+        assert db.session.get(Workout, 2).exercise == "Squat"
+        assert db.session.get(Workout, 3).exercise == "Squat"  # одно упражнение на все написания
+        assert ExerciseStats.query.one().workouts == 3
+        from services import search_workouts
+        assert [w.id for w in search_workouts(1, "ok")[0]] == [2]
+
+# ===================== Фабрика приложения =====================
+def test_import_app_is_lightweight():
+    import subprocess
+    import sys
+    import os
+    probe = ("import sys, app\n"
+             "assert 'sqlalchemy' not in sys.modules and 'models' not in sys.modules\n"
+             "app.create_app()\n"
+             "assert 'importer' not in sys.modules and 'exporter' not in sys.modules\n")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run([sys.executable, "-c", probe], cwd=root, check=True)
+
+
+def test_admin_route_registered_once():
+    rules = [rule.endpoint for rule in app.url_map.iter_rules() if rule.rule == "/admin"]
+    assert rules == ["admin.index"]
+    other = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'})
+    assert other.extensions['response_cache'] is not response_cache
+
+# ===================== SQLite под нагрузкой =====================
+def test_wal_readers_and_writers_do_not_block(tmp_path):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from sqlalchemy import text
+    from config import ProductionConfig
+    from services import create_workout
+
+    prod = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'load.db'}",
+                       'RESPONSE_CACHE': None}, config_class=ProductionConfig)
+    with prod.app_context():
+        db.create_all()
+        assert db.session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        athlete_id = make_user("load")
+        create_workout(athlete_id, "2025-10-01", "Squat", 1, 1, 100)
+
+    def count():
+        with prod.app_context():
+            return Workout.query.filter_by(user_id=athlete_id).count()
+
+    def write(day):
+        with prod.app_context():
+            create_workout(athlete_id, f"2025-11-{day:02d}", "Squat", 1, 1, 100)
+
+    with prod.app_context():
+        # незавершённая запись не мешает читателям
+        writer = db.engine.connect()
+        writer.exec_driver_sql("BEGIN IMMEDIATE")
+        writer.exec_driver_sql(f"INSERT INTO workout (user_id, date) VALUES ({athlete_id}, '2025-10-02')")
+        started = time.monotonic()
+        with ThreadPoolExecutor(4) as pool:
+            assert list(pool.map(lambda _: count(), range(8))) == [1] * 8
+        assert time.monotonic() - started < 1  # не ждали busy_timeout
+        writer.rollback()
+        writer.close()
+
+        # открытая транзакция чтения не мешает записи
+        reader = db.engine.connect()
+        reader.exec_driver_sql("BEGIN")
+        assert reader.exec_driver_sql("SELECT count(*) FROM workout").scalar() == 1
+        started = time.monotonic()
+        thread = threading.Thread(target=write, args=(1,))
+        thread.start()
+        thread.join(timeout=5)
+        assert time.monotonic() - started < 1
+        assert reader.exec_driver_sql("SELECT count(*) FROM workout").scalar() == 1  # свой снимок
+        reader.rollback()
+        reader.close()
+
+    # параллельные писатели ждут друг друга, а не падают с 'database is locked'
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(write, range(2, 26)))
+    assert count() == 26
+
+# ===================== Синтетические данные =====================
+def test_datagen_is_seeded(client):
+    import stats
+    from benchmarks.datagen import generate
+    with client.application.app_context():
+        ids = generate(users=3, coaches=2, workouts_per_user=20, comments_per_workout=1.5, seed=7)
+        assert len(ids["users"]) == 3 and len(ids["coaches"]) == 2
+        assert Workout.query.count() == 60
+        assert Comment.query.count() >= 60
+        first = [(w.date, w.exercise, w.weight) for w in Workout.query.order_by(Workout.id)]
+        assert stats.user_totals(ids["users"][0]) == tuple(stats.rollup_totals(ids["users"][0]))
+
+        db.drop_all()
+        db.create_all()
+        generate(users=3, coaches=2, workouts_per_user=20, comments_per_workout=1.5, seed=7)
+        assert [(w.date, w.exercise, w.weight) for w in Workout.query.order_by(Workout.id)] == first
+
+# ===================== Метрики =====================
+def test_metrics_count_requests_and_queries(caplog):
+    metered = create_app({'TESTING': True, 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:',
+                          'METRICS_ENABLED': True, 'METRICS_TOKEN': 'scrape', 'SLOW_QUERY_MS': 0})
+    with metered.app_context():
+        db.create_all()
+        make_user("metered")
+        make_user("metricsadmin", role="admin")
+    client = metered.test_client()
+    client.post("/login", data={"username": "metered", "password": "pass"})
+
+    rv = client.get("/dashboard")
+    assert 'queries"' in rv.headers["Server-Timing"]
+    assert "Медленный SQL" in caplog.text
+
+    assert client.get("/admin/metrics").status_code == 403  # не админ
+    rv = client.get("/admin/metrics", headers={"Authorization": "Bearer scrape"})
+    body = rv.data.decode()
+    assert rv.status_code == 200
+    assert 'http_request_duration_seconds_count{endpoint="user.dashboard",method="GET"} 1' in body
+    assert 'http_request_sql_queries_bucket{endpoint="user.dashboard",le="+Inf"} 1' in body
+    assert "sql_slow_queries_total " in body
+
+    client.get("/logout")
+    client.post("/login", data={"username": "metricsadmin", "password": "pass"})
+    assert client.get("/admin/metrics").status_code == 200
+
+
+def test_metrics_disabled_by_default(client):
+    assert "Server-Timing" not in client.get("/login").headers
+    assert client.get("/admin/metrics").status_code == 404
+
 # ===================== Logout =====================
 def test_logout(client):
     client.post("/register", data={"username": "luser", "password": "pass"})
@@ -0,0 +1,15 @@
+"""Маршруты приложения, по блюпринту на роль.
+
+- auth  — вход, регистрация, выход и корневой редирект;
+- user  — дневник спортсмена: тренировки, прогресс, импорт и выгрузка;
+- coach — тренер (/coach);
+- admin — админка (/admin);
+- api   — JSON API v1 (/api/v1).
+"""
+
+
+def register_blueprints(app):
+    from views import auth, user, coach, admin, api
+
+    for module in (auth, user, coach, admin, api):
+        app.register_blueprint(module.bp)
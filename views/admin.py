@@ -0,0 +1,101 @@
+import hmac
+
+from flask import Blueprint, Response, render_template, redirect, url_for, jsonify, request, abort, current_app
+from flask_login import login_required, current_user
+from sqlalchemy import func, select
+
+from cache import get_cache
+from models import db, User, CoachAthlete, Workout
+from principals import invalidate_principal
+from services import purge_user, purge_running, start_background_purge, assign_athlete, unassign_athlete
+
+bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+
+@bp.route("")
+@login_required
+def index():
+    if current_user.role != 'admin':
+        return "Доступ запрещён"
+    users = User.query.all()
+    # повторить удаление можно, только если оно не идёт в этом процессе
+    running = {u.id for u in users if u.role == 'deleting' and purge_running(u.id)}
+    return render_template("admin.html", users=users, running=running)
+
+
+@bp.route("/coaches", methods=["GET", "POST"])
+@login_required
+def coaches():
+    """Закрепление спортсменов за тренерами."""
+    if current_user.role != 'admin':
+        return "Доступ запрещён"
+
+    if request.method == "POST":
+        coach = db.session.get(User, request.form.get("coach_id", type=int) or 0)
+        athlete = db.session.get(User, request.form.get("athlete_id", type=int) or 0)
+        if coach is None or athlete is None or coach.role != 'coach' or athlete.role != 'user':
+            return "Нужны тренер и спортсмен", 400
+        if request.form.get("action") == "remove":
+            unassign_athlete(coach.id, athlete.id)
+        else:
+            assign_athlete(coach.id, athlete.id)
+        return redirect(url_for("admin.coaches"))
+
+    coach_list = User.query.filter_by(role='coach').order_by(User.username).all()
+    athletes = User.query.filter_by(role='user').order_by(User.username).all()
+    rosters = {coach.id: [] for coach in coach_list}
+    rows = db.session.execute(
+        select(CoachAthlete.coach_id, User)
+        .join(User, User.id == CoachAthlete.athlete_id)
+        .order_by(User.username)
+    ).all()
+    for coach_id, athlete in rows:
+        rosters.setdefault(coach_id, []).append(athlete)
+    return render_template("admin_coaches.html", coaches=coach_list, athletes=athletes, rosters=rosters)
+
+
+@bp.route("/cache")
+@login_required
+def cache_stats():
+    if current_user.role != 'admin':
+        return "Доступ запрещён"
+    return jsonify(get_cache().stats())
+
+
+@bp.route("/metrics")
+def metrics():
+    registry = current_app.extensions.get("metrics")
+    if registry is None:
+        abort(404)  # METRICS_ENABLED выключен
+    # сборщик метрик входит по токену, человек — как админ
+    token = current_app.config["METRICS_TOKEN"]
+    by_token = token and hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+    if not by_token and not (current_user.is_authenticated and current_user.role == 'admin'):
+        return "Доступ запрещён", 403
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@bp.route("/delete/<int:user_id>")
+@login_required
+def delete_user(user_id):
+    if current_user.role != 'admin':
+        return "Доступ запрещён"
+    user = db.session.get(User, user_id)
+    if user and user.role == 'deleting':
+        # фоновое удаление прервалось (ошибка, перезапуск воркера) — запускаем снова,
+        # уже удалённые пачки пропускаются; идущее удаление второй раз не запускается
+        if not purge_running(user.id):
+            start_background_purge(user.id)
+    elif user:
+        workouts = db.session.execute(
+            select(func.count(Workout.id)).where(Workout.user_id == user.id)
+        ).scalar()
+        if workouts > current_app.config['BACKGROUND_PURGE_THRESHOLD']:
+            # большую историю удаляем в фоне, чтобы не держать запрос админа
+            user.role = 'deleting'
+            db.session.commit()
+            invalidate_principal(user.id)
+            start_background_purge(user.id)
+        else:
+            purge_user(user.id)
+    return redirect(url_for("admin.index"))
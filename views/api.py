@@ -0,0 +1,251 @@
+"""JSON API v1: тренировки, прогресс и статистика текущего пользователя."""
+import hashlib
+from datetime import date, datetime
+from functools import wraps
+
+from flask import Blueprint, Response, request, jsonify, abort, current_app, make_response
+from flask_login import login_required, current_user
+from sqlalchemy import select
+
+import stats
+from catalog import get_catalog
+from models import db, Workout, ExerciseStats
+from services import (create_workout, update_workout, remove_workout, workouts_page, data_version,
+                      parse_search_filters, search_workouts, parse_stats_range, range_statistics,
+                      daily_statistics)
+
+bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+def api_user_required(view):
+    """Вход обязателен, доступ только для обычных пользователей."""
+    @wraps(view)
+    @login_required
+    def wrapper(*args, **kwargs):
+        if current_user.role != 'user':
+            return jsonify(error="только для обычных пользователей"), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def with_etag(view):
+    """ETag из версии данных пользователя: при совпадении 304 без запроса данных."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        seed = f"{current_user.id}:{data_version(current_user.id)}:{date.today()}:{request.full_path}"
+        etag = hashlib.sha1(seed.encode()).hexdigest()[:20]
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = jsonify(view(*args, **kwargs))
+        response.set_etag(etag)
+        return response
+    return wrapper
+
+
+def workout_to_dict(workout):
+    return {
+        "id": workout.id,
+        "date": workout.date.isoformat() if workout.date else None,
+        "exercise": workout.exercise,
+        "sets": workout.sets,
+        "reps": workout.reps,
+        "weight": workout.weight,
+        "comments": [{"content": c.content, "date": c.date.isoformat() if c.date else None}
+                     for c in workout.comments],
+    }
+
+
+def own_workout_or_404(workout_id):
+    workout = db.session.get(Workout, workout_id)
+    if workout is None or workout.user_id != current_user.id:
+        abort(404)
+    return workout
+
+
+def workout_values_from_json():
+    """Поля тренировки из тела запроса, проверка та же, что при импорте."""
+    import importer
+
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return None, (jsonify(error="ожидается JSON-объект"), 400)
+    try:
+        return importer.parse_row(body), None
+    except ValueError as e:
+        return None, (jsonify(error=str(e)), 400)
+
+
+@bp.route("/workouts", methods=["GET"])
+@api_user_required
+@with_etag
+def list_workouts():
+    per_page = min(request.args.get("limit", current_app.config['WORKOUTS_PER_PAGE'], type=int), 500)
+    workouts, next_cursor = workouts_page(current_user.id, request.args.get("cursor"), max(per_page, 1))
+    return {"items": [workout_to_dict(w) for w in workouts], "next_cursor": next_cursor}
+
+
+@bp.route("/search")
+@api_user_required
+@with_etag
+def search():
+    try:
+        filters = parse_search_filters(request.args)
+    except ValueError as e:
+        abort(make_response(jsonify(error=str(e)), 400))  # with_etag ждёт словарь, поэтому через abort
+    per_page = min(request.args.get("limit", current_app.config['WORKOUTS_PER_PAGE'], type=int), 500)
+    workouts, next_cursor = search_workouts(current_user.id, cursor=request.args.get("cursor"),
+                                            per_page=max(per_page, 1), **filters)
+    return {"items": [workout_to_dict(w) for w in workouts], "next_cursor": next_cursor}
+
+
+@bp.route("/workouts", methods=["POST"])
+@api_user_required
+def add_workout():
+    values, error = workout_values_from_json()
+    if error:
+        return error
+    workout = create_workout(current_user.id, **values)
+    return jsonify(workout_to_dict(workout)), 201
+
+
+@bp.route("/workouts/<int:workout_id>", methods=["GET"])
+@api_user_required
+@with_etag
+def get_workout(workout_id):
+    return workout_to_dict(own_workout_or_404(workout_id))
+
+
+@bp.route("/workouts/<int:workout_id>", methods=["PUT"])
+@api_user_required
+def edit_workout(workout_id):
+    workout = own_workout_or_404(workout_id)
+    values, error = workout_values_from_json()
+    if error:
+        return error
+    update_workout(workout, **values)
+    return jsonify(workout_to_dict(workout))
+
+
+@bp.route("/workouts/<int:workout_id>", methods=["DELETE"])
+@api_user_required
+def delete_workout(workout_id):
+    remove_workout(own_workout_or_404(workout_id))
+    return "", 204
+
+
+@bp.route("/progress")
+@api_user_required
+@with_etag
+def progress():
+    catalog = get_catalog()
+    series = {}
+    rows = (db.session.execute(
+        select(Workout.exercise_id, Workout.date, Workout.weight)
+        .where(Workout.user_id == current_user.id)
+        .order_by(Workout.exercise_id, Workout.date, Workout.id)
+    ))
+    for exercise_id, day, weight in rows:
+        series.setdefault(catalog.name(exercise_id), []).append([day.isoformat() if day else None, weight])
+
+    summary = {row.exercise: {"workouts": row.workouts, "best_weight": row.best_weight,
+                              "last_weight": row.last_weight,
+                              "last_date": row.last_date.isoformat() if row.last_date else None}
+               for row in ExerciseStats.query.filter_by(user_id=current_user.id)}
+    return {"series": series, "summary": summary}
+
+
+# ---------- Статистика за произвольный период ----------
+def stats_range():
+    try:
+        return parse_stats_range(request.args, current_app.config['STATS_MAX_BUCKETS'])
+    except ValueError as e:
+        abort(make_response(jsonify(error=str(e)), 400))
+
+
+def range_to_dict(params):
+    return {"from": params["date_from"].isoformat(), "to": params["date_to"].isoformat(),
+            "period": params["period"], "exercise": params["exercise"]}
+
+
+@bp.route("/stats/volume")
+@api_user_required
+@with_etag
+def range_volume():
+    params = stats_range()
+    buckets = range_statistics(current_user.id, **params)
+    return {**range_to_dict(params),
+            "buckets": [{**b, "start": b["start"].isoformat()} for b in buckets]}
+
+
+@bp.route("/stats/calendar")
+@api_user_required
+@with_etag
+def calendar():
+    params = stats_range()
+    params.pop("period")
+    days = daily_statistics(current_user.id, **params)
+    return {"from": params["date_from"].isoformat(), "to": params["date_to"].isoformat(),
+            "exercise": params["exercise"], "days": {day.isoformat(): v for day, v in days.items()}}
+
+
+# ---------- Готовые ряды для графиков (static/chart.js) ----------
+MONTH_LABELS = ["янв", "фев", "мар", "апр", "май", "июн", "июл", "авг", "сен", "окт", "ноя", "дек"]
+
+
+@bp.route("/charts/monthly")
+@api_user_required
+@with_etag
+def monthly_chart():
+    year = request.args.get("year", datetime.now().year, type=int)
+    months = stats.rollup_monthly(current_user.id, year)
+    return {"title": f"Объём за {year} год", "labels": MONTH_LABELS,
+            "series": [{"name": "Вес × подходы × повторения", "type": "bar",
+                        "values": [months[m] for m in range(1, 13)]}]}
+
+
+PERIOD_LABELS = {
+    "week": lambda start: start.strftime("%d.%m.%y"),
+    "month": lambda start: f"{MONTH_LABELS[start.month - 1]} {start.year}",
+    "year": lambda start: str(start.year),
+}
+
+
+@bp.route("/charts/volume")
+@api_user_required
+@with_etag
+def volume_chart():
+    params = stats_range()
+    buckets = range_statistics(current_user.id, **params)
+    label = PERIOD_LABELS[params["period"]]
+    title = f"Объём: {params['exercise'] or 'все упражнения'}, {params['date_from']:%d.%m.%Y} – {params['date_to']:%d.%m.%Y}"
+    return {"title": title, "labels": [label(b["start"]) for b in buckets],
+            "series": [{"name": "Вес × подходы × повторения", "type": "bar",
+                        "values": [b["volume"] for b in buckets]}]}
+
+
+@bp.route("/charts/progress")
+@api_user_required
+@with_etag
+def progress_chart():
+    charts = []
+    series = stats.progress_series(current_user.id, current_app.config['PROGRESS_MAX_POINTS'])
+    for exercise, data in series.items():
+        points = data["points"]
+        charts.append({
+            "title": exercise,
+            "labels": [p["week"].strftime("%d.%m.%y") for p in points],
+            # рекорды отмечаются над первой серией — оценкой 1ПМ
+            "series": [{"name": "1ПМ", "type": "line", "values": [p["e1rm"] for p in points]},
+                       {"name": "Вес", "type": "line", "values": [p["weight"] for p in points]}],
+            "marks": [i for i, p in enumerate(points) if p["pr"]],
+        })
+    return {"charts": charts}
+
+
+@bp.route("/statistics")
+@api_user_required
+@with_etag
+def statistics():
+    year = request.args.get("year", datetime.now().year, type=int)
+    return {"year": year, "months": stats.rollup_monthly(current_user.id, year)}
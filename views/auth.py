@@ -0,0 +1,63 @@
+from flask import Blueprint, render_template, redirect, url_for, request
+from flask_login import login_user, login_required, current_user, logout_user
+
+from models import db, User
+from principals import invalidate_principal
+from services import register_user
+
+bp = Blueprint("auth", __name__)
+
+# куда попадает пользователь после входа
+HOME_BY_ROLE = {"admin": "admin.index", "coach": "coach.index"}
+
+
+@bp.route("/")
+def index():
+    if current_user.is_authenticated:
+        return redirect(url_for(HOME_BY_ROLE.get(current_user.role, "user.dashboard")))
+    return redirect(url_for("auth.login"))
+
+
+@bp.route("/register", methods=["GET", "POST"])
+def register():
+    if request.method == "POST":
+        username = request.form.get("username")
+        password = request.form.get("password")
+
+        if register_user(username, password) is None:
+            return "Пользователь уже существует"
+
+        # НЕ логиним сразу
+        return redirect(url_for("auth.login"))
+
+    return render_template("register.html")
+
+
+@bp.route("/login", methods=["GET", "POST"])
+def login():
+    if request.method == "POST":
+        username = request.form.get("username")
+        password = request.form.get("password")
+        user = User.query.filter_by(username=username).first()
+        if user and user.role != 'deleting' and user.check_password(password):
+            # параметры хэширования поменялись — пересчитываем хэш, пока знаем пароль
+            if user.password_needs_rehash():
+                user.set_password(password)
+                db.session.commit()
+                invalidate_principal(user.id)
+            login_user(user)
+
+            # Редирект в зависимости от роли
+            return redirect(url_for(HOME_BY_ROLE.get(user.role, "user.dashboard")))
+        else:
+            return "Неверный логин или пароль"
+
+    return render_template("login.html")
+
+
+# Выход
+@bp.route("/logout")
+@login_required
+def logout():
+    logout_user()
+    return redirect(url_for("auth.login"))
@@ -0,0 +1,186 @@
+import json
+import math
+import time
+
+from flask import Blueprint, Response, render_template, redirect, url_for, request, jsonify
+from flask import current_app, stream_with_context
+from flask_login import login_required, current_user
+
+from models import db
+from services import (add_comment as save_comment, add_comments as save_comments, workouts_page,
+                      latest_workouts, coach_athletes, coach_workout, changes_since, latest_change_id)
+from views.api import workout_to_dict
+
+bp = Blueprint("coach", __name__, url_prefix="/coach")
+
+
+@bp.route("")
+@login_required
+def index():
+    if current_user.role != 'coach':
+        return "Доступ только для тренера"
+
+    per_page = current_app.config['WORKOUTS_PER_PAGE']
+    athlete_id = request.args.get('athlete', type=int)
+    # только закреплённые спортсмены; с ?athlete= листаем историю одного из них
+    users = coach_athletes(current_user.id, athlete_id)
+
+    if athlete_id and users:
+        pages = {athlete_id: workouts_page(athlete_id, request.args.get('cursor'), per_page)}
+    else:
+        # тренировки и комментарии всех спортсменов — фиксированное число запросов
+        pages = latest_workouts([u.id for u in users], per_page)
+
+    users_progress = {}
+    next_pages = {}
+    for user in users:
+        workouts, next_cursor = pages[user.id]
+        users_progress[user.username] = workouts
+        if next_cursor:
+            next_pages[user.username] = url_for('coach.index', athlete=user.id, cursor=next_cursor)
+
+    return render_template("coach.html", users_progress=users_progress,
+                           next_pages=next_pages, feed_cursor=latest_change_id())
+
+
+@bp.route("/comment/<int:workout_id>", methods=["POST"])
+@login_required
+def add_comment(workout_id):
+    if current_user.role != 'coach':
+        return "Доступ только для тренера"
+
+    if coach_workout(current_user.id, workout_id) is None:
+        return "Доступ только к своим спортсменам", 403
+
+    content = request.form.get("content")
+    if content:
+        save_comment(workout_id, current_user.id, content)
+    return redirect(url_for("coach.index"))
+
+
+# ---------- Разбор тренировок: много комментариев одним запросом ----------
+def comments_from_request():
+    """[(workout_id, текст)] из JSON {"comments": [{"workout_id", "content"}]}
+    или из полей формы comment-<id>; пустые комментарии пропускаются."""
+    if request.is_json:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            raise ValueError("ожидается JSON-объект с полем comments")
+        items = body.get("comments")
+        if not isinstance(items, list):
+            raise ValueError("ожидается список comments")
+        try:
+            comments = [(int(item["workout_id"]), str(item["content"]).strip()) for item in items]
+        except (TypeError, KeyError, ValueError):
+            raise ValueError("у комментария нужны workout_id и content")
+    else:
+        comments = [(int(name[8:]), value.strip()) for name, value in request.form.items()
+                    if name.startswith("comment-") and name[8:].isdigit()]
+    comments = [(workout_id, content) for workout_id, content in comments if content]
+    if len(comments) > current_app.config['COACH_COMMENTS_MAX']:
+        raise ValueError(f"не больше {current_app.config['COACH_COMMENTS_MAX']} комментариев за раз")
+    return comments
+
+
+@bp.route("/comments", methods=["POST"])
+@login_required
+def add_comments():
+    """Сохраняет все комментарии одной транзакцией и возвращает только
+    затронутые тренировки, без перезагрузки всего списка спортсменов."""
+    if current_user.role != 'coach':
+        return jsonify(error="доступ только для тренера"), 403
+    try:
+        comments = comments_from_request()
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    if not comments:
+        if request.is_json:
+            return jsonify(error="нет комментариев"), 400
+        return redirect(url_for("coach.index"))
+
+    rows = save_comments(current_user.id, comments)
+    if rows is None:
+        if request.is_json:
+            return jsonify(error="доступ только к своим спортсменам"), 403
+        return "Доступ только к своим спортсменам", 403
+    if request.is_json:
+        return jsonify(workouts=[{**workout_to_dict(workout), "athlete": username}
+                                 for workout, username in rows])
+    return render_template("coach_comments.html", rows=rows, count=len(comments))
+
+
+# ---------- Лента изменений ----------
+# Курсор — id последней полученной записи ChangeLog. Ожидание новых записей —
+# опрос max(id) по первичному ключу раз в FEED_POLL_INTERVAL секунд, а не
+# перезагрузка всей страницы тренера.
+def change_to_dict(change, username, workout, comment):
+    entry = {"id": change.id, "kind": change.kind, "athlete": username,
+             "workout_id": change.workout_id, "at": change.created_at.isoformat(timespec="seconds")}
+    if workout is not None:
+        entry["workout"] = {"date": workout.date.isoformat() if workout.date else None,
+                            "exercise": workout.exercise, "sets": workout.sets,
+                            "reps": workout.reps, "weight": workout.weight}
+    if comment is not None:
+        entry["comment"] = comment.content
+    return entry
+
+
+def wait_for_changes(coach_id, cursor, timeout):
+    """Ждёт записей о своих спортсменах после cursor не дольше timeout секунд.
+
+    Возвращает (изменения, новый курсор); чужие записи курсор тоже проходит,
+    чтобы не просматривать их снова.
+    """
+    config = current_app.config
+    deadline = time.monotonic() + timeout
+    while True:
+        latest = latest_change_id()
+        if latest > cursor:
+            rows = changes_since(cursor, config['FEED_BATCH_SIZE'], coach_id)
+            if rows:
+                return [change_to_dict(*row) for row in rows], rows[-1][0].id
+            cursor = latest
+        db.session.close()  # не держим соединение из пула, пока ждём
+        if time.monotonic() >= deadline:
+            return [], cursor
+        time.sleep(min(config['FEED_POLL_INTERVAL'], max(deadline - time.monotonic(), 0)))
+
+
+@bp.route("/feed")
+@login_required
+def feed():
+    """Long-poll: изменения после ?cursor=, ожидание до ?wait= секунд."""
+    if current_user.role != 'coach':
+        return jsonify(error="доступ только для тренера"), 403
+    cursor = request.args.get("cursor", 0, type=int)
+    timeout = current_app.config['FEED_LONG_POLL_TIMEOUT']
+    wait = request.args.get("wait", timeout, type=float)
+    if not math.isfinite(wait):  # nan дал бы срок ожидания, который никогда не наступает
+        return jsonify(error="неверное значение wait"), 400
+    changes, cursor = wait_for_changes(current_user.id, cursor, min(max(wait, 0), timeout))
+    return jsonify(changes=changes, cursor=cursor)
+
+
+@bp.route("/feed/stream")
+@login_required
+def feed_stream():
+    """Server-sent events. Поток закрывается через FEED_STREAM_SECONDS,
+    EventSource переподключается сам и присылает Last-Event-ID."""
+    if current_user.role != 'coach':
+        return jsonify(error="доступ только для тренера"), 403
+    cursor = request.headers.get("Last-Event-ID", type=int) or request.args.get("cursor", 0, type=int)
+    config = current_app.config
+    coach_id = current_user.id
+
+    def events(cursor):
+        yield f"retry: {int(config['FEED_POLL_INTERVAL'] * 1000)}\n\n"
+        deadline = time.monotonic() + config['FEED_STREAM_SECONDS']
+        while time.monotonic() < deadline:
+            changes, cursor = wait_for_changes(coach_id, cursor, min(15, max(deadline - time.monotonic(), 0)))
+            if not changes:
+                yield ": ping\n\n"  # не даём прокси закрыть молчащее соединение
+            for change in changes:
+                yield f"id: {change['id']}\nevent: change\ndata: {json.dumps(change, ensure_ascii=False)}\n\n"
+
+    return Response(stream_with_context(events(cursor)), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
@@ -0,0 +1,203 @@
+import io
+from datetime import timedelta
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash, current_app
+from flask import Response, stream_with_context, abort
+from flask_login import login_required, current_user
+
+import stats
+from cache import cached_per_user
+from models import Workout, ExerciseStats
+from services import (create_workout, update_workout, remove_workout, workouts_page,
+                      import_workouts, export_records, parse_search_filters, search_workouts,
+                      SEARCH_FILTERS, parse_stats_range, daily_statistics)
+
+bp = Blueprint("user", __name__)
+
+
+@bp.route("/dashboard")
+@login_required
+def dashboard():
+    if current_user.role != 'user':
+        return "Только для обычных пользователей"
+
+    cursor = request.args.get('cursor')
+    workouts, next_cursor = workouts_page(current_user.id, cursor)
+
+    # итоги считаются по всей истории, а не по текущей странице
+    total_workouts, total_weight = stats.rollup_totals(current_user.id)
+
+    return render_template("dashboard.html", workouts=workouts,
+                           total_workouts=total_workouts,
+                           total_weight=total_weight,
+                           is_first_page=not cursor,
+                           next_cursor=next_cursor)
+
+
+@bp.route("/progress")
+@login_required
+@cached_per_user
+def progress():
+    if current_user.role != 'user':
+        flash("Доступ разрешён только для обычных пользователей!", "danger")
+        return redirect(url_for('auth.index'))
+
+    # недельные максимумы из сводки, прореженные до PROGRESS_MAX_POINTS
+    exercise_progress = stats.progress_series(current_user.id, current_app.config['PROGRESS_MAX_POINTS'])
+    exercise_stats = {row.exercise: row for row in ExerciseStats.query.filter_by(user_id=current_user.id)}
+
+    return render_template("progress.html", exercise_progress=exercise_progress,
+                           exercise_stats=exercise_stats)
+
+
+STATS_ARGS = ("from", "to", "period", "exercise", "year")
+
+
+@bp.route("/statistics")
+@login_required
+@cached_per_user
+def statistics():
+    if current_user.role != 'user':
+        flash("Доступ разрешён только для обычных пользователей!", "danger")
+        return redirect(url_for('auth.index'))
+
+    # параметры формы — для ссылки на ряды графика (/api/v1/charts/volume);
+    # только известные, иначе ?endpoint= или ?_external= попадут в url_for
+    args = {name: request.args[name] for name in STATS_ARGS if request.args.get(name)}
+    try:
+        params = parse_stats_range(request.args, current_app.config['STATS_MAX_BUCKETS'])
+    except ValueError as e:
+        return render_template("statistics.html", args=args, error=str(e), weeks=[])
+
+    # тепловая карта — последние HEATMAP_DAYS дней выбранного диапазона
+    date_to = params["date_to"]
+    date_from = max(params["date_from"], date_to - timedelta(days=current_app.config['HEATMAP_DAYS'] - 1))
+    daily = daily_statistics(current_user.id, date_from, date_to, params["exercise"])
+    return render_template("statistics.html", args=args, params=params,
+                           weeks=stats.calendar_heatmap(daily, date_from, date_to),
+                           exercise_names=stats.exercise_names(current_user.id))
+
+
+def workout_values_from_form():
+    """Поля тренировки из формы, проверка та же, что при импорте и в API (ValueError)."""
+    import importer
+
+    return importer.parse_row(request.form.to_dict())
+
+
+# Добавление тренировки
+@bp.route("/add", methods=["GET", "POST"])
+@login_required
+def add_workout():
+    if current_user.role != 'user':
+        return render_template("access_denied.html", message="Только для обычных пользователей")
+
+    if request.method == "POST":
+        try:
+            values = workout_values_from_form()
+        except ValueError as e:
+            return render_template("add_workout.html", error=str(e),
+                                   exercise_names=stats.exercise_names(current_user.id)), 400
+        create_workout(current_user.id, **values)
+        return redirect(url_for("user.dashboard"))
+
+    return render_template("add_workout.html", exercise_names=stats.exercise_names(current_user.id))
+
+
+@bp.route("/edit/<int:workout_id>", methods=["GET", "POST"])
+@login_required
+def edit_workout(workout_id):
+    workout = Workout.query.get(workout_id)
+
+    # Проверяем, что это упражнение текущего пользователя
+    if workout.user_id != current_user.id or current_user.role != 'user':
+        return render_template("access_denied.html", message="Доступ запрещён")
+
+    if request.method == "POST":
+        try:
+            values = workout_values_from_form()
+        except ValueError as e:
+            return render_template("edit_workout.html", workout=workout, error=str(e),
+                                   exercise_names=stats.exercise_names(current_user.id)), 400
+        update_workout(workout, **values)
+        return redirect(url_for("user.dashboard"))
+
+    return render_template("edit_workout.html", workout=workout, exercise_names=stats.exercise_names(current_user.id))
+
+
+@bp.route("/delete/<int:workout_id>")
+@login_required
+def delete_workout(workout_id):
+    workout = Workout.query.get(workout_id)
+
+    if workout.user_id != current_user.id or current_user.role != 'user':
+        return render_template("access_denied.html", message="Доступ запрещён")
+
+    remove_workout(workout)
+    return redirect(url_for("user.dashboard"))
+
+
+# ---------- Поиск ----------
+@bp.route("/search")
+@login_required
+def search():
+    if current_user.role != 'user':
+        return render_template("access_denied.html", message="Только для обычных пользователей")
+
+    # параметры формы без курсора — для ссылки на следующую страницу; только
+    # известные фильтры, иначе ?endpoint= или ?_external= попадут в url_for
+    args = {name: request.args[name] for name in ("q", *SEARCH_FILTERS) if request.args.get(name)}
+    try:
+        filters = parse_search_filters(request.args)
+    except ValueError as e:
+        return render_template("search.html", args=args, error=str(e), workouts=[])
+    workouts, next_cursor = search_workouts(current_user.id, cursor=request.args.get('cursor'), **filters)
+    return render_template("search.html", args=args, workouts=workouts, next_cursor=next_cursor)
+
+
+# ---------- Массовый импорт ----------
+@bp.route("/import", methods=["GET", "POST"])
+@login_required
+def import_page():
+    if current_user.role != 'user':
+        return render_template("access_denied.html", message="Только для обычных пользователей")
+
+    if request.method == "POST":
+        import importer
+
+        upload = request.files.get("file")
+        if not upload or not upload.filename:
+            return render_template("import.html", error="Выберите файл")
+        fmt = request.form.get("format") or importer.detect_format(upload.filename)
+        stream = io.TextIOWrapper(upload.stream, encoding="utf-8-sig", newline="")
+        result = import_workouts(current_user.id, stream, fmt)
+        return render_template("import.html", result=result)
+
+    return render_template("import.html")
+
+
+# ---------- Выгрузка истории ----------
+EXPORT_FORMATS = {"csv": ("text/csv", "csv_lines"),
+                  "jsonl": ("application/x-ndjson", "jsonl_lines")}
+
+
+@bp.route("/export/<fmt>")
+@login_required
+def export(fmt):
+    if current_user.role != 'user':
+        return render_template("access_denied.html", message="Только для обычных пользователей")
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+
+    import exporter
+
+    mimetype, render_lines = EXPORT_FORMATS[fmt]
+    filename = f"workouts.{fmt}"
+    chunks = exporter.chunked(getattr(exporter, render_lines)(export_records(current_user.id)))
+    if request.args.get("gzip"):
+        chunks = exporter.gzip_chunks(chunks)
+        filename += ".gz"
+        mimetype = "application/gzip"
+
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
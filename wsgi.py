@@ -0,0 +1,12 @@
+"""Точка входа для WSGI-серверов с несколькими воркерами, например:
+
+    gunicorn -w 4 --threads 8 wsgi:app
+    waitress-serve --threads 8 wsgi:app
+
+Настройки — config.ProductionConfig (WAL, пул соединений, общий кэш страниц).
+Таблицы создаются заранее: flask --app app init-db.
+"""
+from app import create_app
+from config import ProductionConfig
+
+app = create_app(config_class=ProductionConfig)